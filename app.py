@@ -1,129 +1,194 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from PIL import Image
-import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-import io
-import base64
+import startup
+import functools
+import importlib
+import time
+import metrics
+
+with startup.trace.phase('import flask', 'importing'):
+    from flask import Flask, Response, g, request, jsonify
+    from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
 
-# Modell beim Start laden
-print("Lade MNIST Modell...")
-try:
-    model = keras.models.load_model('mnist_model.keras')
-    print("✓ Modell erfolgreich geladen!")
-except Exception as e:
-    print(f"✗ Fehler beim Laden des Modells: {e}")
-    model = None
+# Wird von load_backend gesetzt (beim verzögerten Start erst im Hintergrund)
+serving = None
+# Erreichbar, bevor das Modell bereit ist (Status für Orchestrierung und Monitoring)
+STARTUP_ROUTES = ('/', '/health', '/metrics')
+
+
+def load_backend():
+    """Schwere Importe (NumPy, PIL, Backend) und Modell laden, jeweils als Phase im Start-Trace"""
+    global serving
+    with startup.trace.phase('import numpy/PIL', 'importing'):
+        # Nur für den Trace vorab importiert, damit 'import serving' nur noch die eigenen Module misst
+        importlib.import_module('numpy')
+        importlib.import_module('PIL.Image')
+    with startup.trace.phase('import serving'):
+        import serving as serving_module
+    serving = serving_module
+    serving.start()
+
+
+def shutdown():
+    if serving is not None:
+        serving.shutdown()
+
+
+if startup.LAZY:
+    # Server bindet sofort; /health meldet importing/loading/warming bis ready
+    startup.run_in_background(load_backend)
+else:
+    load_backend()
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    # Während des Starts nur Status-Endpunkte; alles andere 503 mit Retry-After
+    if (serving is None or not startup.trace.done) and request.path not in STARTUP_ROUTES:
+        state = startup.trace.state
+        message = 'Start fehlgeschlagen' if state == 'failed' else 'Backend startet noch'
+        response = jsonify({'error': message, 'status': state})
+        return response, 503, {'Retry-After': '1'}
+
+
+@app.after_request
+def record_request(response):
+    # Nur bekannte Routen als Label, sonst wächst die Zahl der Zeitreihen mit jeder falschen URL
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.record_request(endpoint, response.status_code, time.perf_counter() - g.request_start)
+    return response
+
 
 @app.route('/')
 def home():
     return jsonify({
         'status': 'Backend läuft',
-        'model_loaded': model is not None,
-        'endpoints': [
-            '/predict - POST: Sendet Bild für Vorhersage',
-            '/health - GET: Überprüft Backend-Status'
-        ]
+        'startup': startup.trace.state,
+        'model_loaded': serving is not None and serving.engine is not None,
+        'endpoints': serving.ENDPOINTS if serving is not None else []
     })
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': model is not None
-    })
+    # 503 bis das Modell geladen und aufgewärmt ist (Readiness); danach wie gewohnt
+    if serving is None or not startup.trace.done:
+        status = startup.trace.snapshot()
+        return jsonify({'status': status['state'], 'model_loaded': False, 'startup': status}), 503
+    return jsonify(serving.health())
+
+
+def request_option(name, data=None):
+    """Option aus Query-Parameter, JSON-Body oder Formularfeld"""
+    value = request.args.get(name)
+    if value is None and isinstance(data, dict):
+        value = data.get(name)
+    if value is None:
+        value = request.form.get(name)
+    return value
+
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None:
+    if serving.engine is None:
         return jsonify({'error': 'Modell nicht geladen'}), 500
 
     try:
-        # Empfange Bild
-        if 'image' not in request.files:
+        # Empfange Bild (Rohdaten, für den Cache-Schlüssel)
+        data = None
+        size = None
+        if request.mimetype == serving.RAW_CONTENT_TYPE:
+            # Schnellpfad: rohe uint8-Graustufenpixel, Maße in den Headern (ohne Base64 und PIL)
+            image_bytes = request.get_data()
+            try:
+                size = serving.raw_image_size(request.headers.get('X-Image-Width'),
+                                              request.headers.get('X-Image-Height'), len(image_bytes))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        elif 'image' not in request.files:
             # Alternative: Base64-kodiertes Bild
             data = request.get_json()
             if data and 'image' in data:
-                # Base64-Bild dekodieren
-                image_data = data['image']
-                if ',' in image_data:
-                    image_data = image_data.split(',')[1]
-                image_bytes = base64.b64decode(image_data)
-                image = Image.open(io.BytesIO(image_bytes))
+                image_bytes = serving.decode_base64(data['image'])
             else:
                 return jsonify({'error': 'Kein Bild gefunden'}), 400
         else:
             # Normaler File-Upload
-            file = request.files['image']
-            image = Image.open(file.stream)
-
-        # Bild vorverarbeiten
-        # In Graustufen konvertieren
-        image = image.convert('L')
-
-        # Auf 28x28 skalieren
-        image = image.resize((28, 28), Image.Resampling.LANCZOS)
-
-        # In NumPy-Array umwandeln
-        img_array = np.array(image)
-
-        # WICHTIG: MNIST hat weiße Ziffern auf schwarzem Hintergrund
-        # Falls Ihr Frontend schwarze Ziffern auf weißem Hintergrund sendet, invertieren:
-        # Prüfen ob Hintergrund hell ist (Durchschnittswert > 127)
-        if np.mean(img_array) > 127:
-            img_array = 255 - img_array  # Invertieren
-
-        # Normalisieren (0-255 -> 0-1)
-        img_array = img_array.astype('float32') / 255.0
-
-        # Reshape für CNN-Modell (1, 28, 28, 1)
-        # Batch-Dimension + Kanal-Dimension
-        img_array = np.expand_dims(img_array, axis=0)  # (1, 28, 28)
-        img_array = np.expand_dims(img_array, axis=-1)  # (1, 28, 28, 1)
-
-        # Vorhersage machen
-        predictions = model.predict(img_array, verbose=0)
-        predicted_digit = int(np.argmax(predictions[0]))
-        confidence = float(predictions[0][predicted_digit])
-
-        # Alle Wahrscheinlichkeiten zurückgeben
-        all_probabilities = {
-            str(i): float(predictions[0][i])
-            for i in range(10)
-        }
-
-        # Debug: Vorverarbeitetes Bild als Base64 zurückgeben
-        processed_img = (img_array[0, :, :, 0] * 255).astype(np.uint8)
-        processed_pil = Image.fromarray(processed_img, mode='L')
-        buffered = io.BytesIO()
-        processed_pil.save(buffered, format="PNG")
-        processed_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-
-        return jsonify({
-            'prediction': predicted_digit,
-            'confidence': confidence,
-            'all_probabilities': all_probabilities,
-            'processed_image': f'data:image/png;base64,{processed_base64}'  # Debug
-        })
+            image_bytes = request.files['image'].read()
+
+        probabilities, img_array = serving.classify_image_bytes(image_bytes, size)
+        with metrics.stage('serialize'):
+            result = serving.prediction_result(probabilities, compact=request_option('format', data) == 'compact')
+
+            # Debug: Vorverarbeitetes Bild nur auf Anfrage (?debug=1 bzw. "debug": true)
+            if serving.is_enabled(request_option('debug', data)):
+                result['processed_image'] = serving.encode_debug_image(img_array)
+
+            response = jsonify(result)
+        return response
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Mehrere Bilder in einem Request: ein gemeinsamer Forward-Pass, Ergebnisse in Eingabereihenfolge"""
+    if serving.engine is None:
+        return jsonify({'error': 'Modell nicht geladen'}), 500
+
+    # Multipart: mehrere 'image'-Dateien, sonst JSON {"images": [base64, ...]}
+    files = request.files.getlist('image')
+    data = None
+    if files:
+        readers = [file.read for file in files]
+    else:
+        data = request.get_json(silent=True)
+        images = data.get('images') if isinstance(data, dict) else None
+        if not isinstance(images, list) or not images:
+            return jsonify({'error': 'Keine Bilder gefunden (erwartet "images": [...])'}), 400
+        readers = [functools.partial(serving.decode_base64, image_data) for image_data in images]
+
+    if len(readers) > serving.BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Zu viele Bilder ({len(readers)} > {serving.BATCH_MAX_ITEMS})'}), 413
+
+    try:
+        result = serving.classify_batch(readers, compact=request_option('format', data) == 'compact')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    with metrics.stage('serialize'):
+        return jsonify(result)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/models', methods=['GET'])
+def models():
+    return jsonify(serving.models())
+
 @app.route('/reload', methods=['POST'])
 def reload_model():
-    global model
+    """Lädt eine Modellversion im Hintergrund (202); mit ?wait=1 blockierend (200)"""
+    data = request.get_json(silent=True)
+    version = request_option('version', data)
+    wait = serving.is_enabled(request_option('wait', data))
     try:
-        model = keras.models.load_model('mnist_model.keras')
-        return jsonify({'status': 'reloaded', 'model_loaded': model is not None})
+        status = serving.reload(version, wait=wait)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except serving.ReloadInProgress as e:
+        return jsonify({'error': str(e), **serving.registry.status()}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    if wait:
+        return jsonify({'status': 'reloaded', 'model_loaded': serving.engine is not None, **status})
+    return jsonify({'status': 'loading', 'loading': status}), 202
+
 
 if __name__ == '__main__':
     print("="*60)
     print("🚀 Flask Backend wird gestartet...")
     print("="*60)
+    startup.trace.mark('bind')
     app.run(debug=True, host='0.0.0.0', port=5000)
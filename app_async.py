@@ -0,0 +1,255 @@
+"""
+Asynchrones MNIST-Backend (aiohttp) mit derselben API wie app.py
+Der Event-Loop wartet nie auf Arbeit: Dekodieren und Vorverarbeitung laufen in einem
+Thread-Pool, die Inferenz in der gemeinsamen Batching-Queue (Future statt blockiertem Thread).
+Langsame Clients belegen so nur eine Coroutine, keinen Worker-Thread.
+"""
+import argparse
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import metrics
+import serving
+
+# Modell vor dem Binden laden (verzögerter Start mit MNIST_LAZY_STARTUP gibt es nur in app.py/serve.py)
+serving.start()
+
+# Threads für Dekodieren/Vorverarbeitung (PIL und NumPy geben den GIL größtenteils frei)
+DECODE_THREADS = int(os.environ.get('MNIST_DECODE_THREADS', str(min(8, (os.cpu_count() or 1) + 2))))
+
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_THREADS, thread_name_prefix='decode')
+# Eigener Pool für lange Aufgaben (ganze Batches, /reload), damit sie das Dekodieren nicht blockieren
+task_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='task')
+
+
+def json_error(message, status):
+    return web.json_response({'error': message}, status=status)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    # Entspricht flask_cors mit Standardeinstellungen (alle Origins)
+    if request.method == 'OPTIONS':
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get('Access-Control-Request-Headers', '*')
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        # Nur bekannte Routen als Label, sonst wächst die Zahl der Zeitreihen mit jeder falschen URL
+        route = request.match_info.route
+        resource = route.resource if route is not None else None
+        endpoint = resource.canonical if resource is not None else 'unmatched'
+        metrics.record_request(endpoint, status, time.perf_counter() - start)
+
+
+async def run_in(pool, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args))
+
+
+async def read_payload(request):
+    """Liest den Body: (Formular/Multipart als MultiDict oder None, JSON-Dict oder None)"""
+    if request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        return await request.post(), None
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    return None, data
+
+
+def request_option(request, name, form=None, data=None):
+    """Option aus Query-Parameter, JSON-Body oder Formularfeld"""
+    value = request.query.get(name)
+    if value is None and isinstance(data, dict):
+        value = data.get(name)
+    if value is None and form is not None:
+        value = form.get(name)
+    return value
+
+
+async def classify_image_bytes(image_bytes, size=None):
+    """Wie serving.classify_image_bytes, ohne den Event-Loop zu blockieren"""
+    cache = serving.cache
+    generation = cache.generation
+    raw_key = serving.raw_cache_key(image_bytes, size)
+    entry = cache.get(raw_key)
+    if entry is not None:
+        return entry
+
+    img_array = await run_in(decode_pool, serving.decode_image, image_bytes, size)
+    pixel_key = cache.pixel_key(img_array)
+    entry = cache.get(pixel_key)
+    if entry is None:
+        with metrics.stage('inference'):
+            probabilities = await asyncio.wrap_future(serving.batcher.submit(img_array))
+        entry = serving.cache_entry(probabilities, img_array)
+        cache.put(pixel_key, entry, generation)
+    cache.put(raw_key, entry, generation)
+    return entry
+
+
+async def home(request):
+    return web.json_response({
+        'status': 'Backend läuft',
+        'model_loaded': serving.engine is not None,
+        'endpoints': serving.ENDPOINTS
+    })
+
+
+async def health(request):
+    return web.json_response(serving.health())
+
+
+async def predict(request):
+    if serving.engine is None:
+        return json_error('Modell nicht geladen', 500)
+
+    try:
+        form, data, size = None, None, None
+        if request.content_type == serving.RAW_CONTENT_TYPE:
+            # Schnellpfad: rohe uint8-Graustufenpixel, Maße in den Headern (ohne Base64 und PIL)
+            image_bytes = await request.read()
+            try:
+                size = serving.raw_image_size(request.headers.get('X-Image-Width'),
+                                              request.headers.get('X-Image-Height'), len(image_bytes))
+            except ValueError as e:
+                return json_error(str(e), 400)
+        else:
+            form, data = await read_payload(request)
+            image = form.get('image') if form is not None else None
+            if isinstance(image, web.FileField):
+                # Normaler File-Upload
+                image_bytes = image.file.read()
+            elif data and 'image' in data:
+                # Alternative: Base64-kodiertes Bild
+                image_bytes = await run_in(decode_pool, serving.decode_base64, data['image'])
+            else:
+                return json_error('Kein Bild gefunden', 400)
+
+        probabilities, img_array = await classify_image_bytes(image_bytes, size)
+        compact = request_option(request, 'format', form, data) == 'compact'
+        with metrics.stage('serialize'):
+            result = serving.prediction_result(probabilities, compact=compact)
+
+            # Debug: Vorverarbeitetes Bild nur auf Anfrage (?debug=1 bzw. "debug": true)
+            if serving.is_enabled(request_option(request, 'debug', form, data)):
+                result['processed_image'] = serving.encode_debug_image(img_array)
+
+            return web.json_response(result)
+
+    except Exception as e:
+        return json_error(str(e), 500)
+
+
+async def predict_batch(request):
+    """Mehrere Bilder in einem Request: ein gemeinsamer Forward-Pass, Ergebnisse in Eingabereihenfolge"""
+    if serving.engine is None:
+        return json_error('Modell nicht geladen', 500)
+
+    # Multipart: mehrere 'image'-Dateien, sonst JSON {"images": [base64, ...]}
+    form, data = await read_payload(request)
+    files = [f for f in form.getall('image', []) if isinstance(f, web.FileField)] if form is not None else []
+    if files:
+        readers = [f.file.read for f in files]
+    else:
+        images = data.get('images') if isinstance(data, dict) else None
+        if not isinstance(images, list) or not images:
+            return json_error('Keine Bilder gefunden (erwartet "images": [...])', 400)
+        readers = [functools.partial(serving.decode_base64, image_data) for image_data in images]
+
+    if len(readers) > serving.BATCH_MAX_ITEMS:
+        return json_error(f'Zu viele Bilder ({len(readers)} > {serving.BATCH_MAX_ITEMS})', 413)
+
+    compact = request_option(request, 'format', form, data) == 'compact'
+    try:
+        result = await run_in(task_pool, serving.classify_batch, readers, compact)
+    except Exception as e:
+        return json_error(str(e), 500)
+    with metrics.stage('serialize'):
+        return web.json_response(result)
+
+
+async def prometheus_metrics(request):
+    return web.Response(body=metrics.registry.render().encode('utf-8'),
+                        headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+async def models(request):
+    return web.json_response(await run_in(task_pool, serving.models))
+
+
+async def reload_model(request):
+    """Lädt eine Modellversion im Hintergrund (202); mit ?wait=1 erst nach dem Austausch (200)"""
+    form, data = await read_payload(request)
+    version = request_option(request, 'version', form, data)
+    wait = serving.is_enabled(request_option(request, 'wait', form, data))
+    try:
+        status = await run_in(task_pool, serving.reload, version, wait)
+    except KeyError as e:
+        return json_error(e.args[0], 404)
+    except serving.ReloadInProgress as e:
+        return web.json_response({'error': str(e), **serving.registry.status()}, status=409)
+    except Exception as e:
+        return json_error(str(e), 500)
+    if wait:
+        return web.json_response({'status': 'reloaded', 'model_loaded': serving.engine is not None, **status})
+    return web.json_response({'status': 'loading', 'loading': status}, status=202)
+
+
+async def on_shutdown(app):
+    # Batching-Queue abarbeiten, dann die Thread-Pools beenden
+    await run_in(None, serving.shutdown)
+    decode_pool.shutdown(wait=True)
+    task_pool.shutdown(wait=True)
+
+
+def create_app():
+    app = web.Application(middlewares=[cors_middleware, metrics_middleware], client_max_size=16 * 1024 * 1024)
+    app.router.add_get('/', home)
+    app.router.add_get('/health', health)
+    app.router.add_post('/predict', predict)
+    app.router.add_post('/predict/batch', predict_batch)
+    app.router.add_get('/metrics', prometheus_metrics)
+    app.router.add_get('/models', models)
+    app.router.add_post('/reload', reload_model)
+    app.router.add_route('OPTIONS', '/{tail:.*}', home)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startet das asynchrone MNIST-Backend (aiohttp)")
+    parser.add_argument('--host', default=os.environ.get('MNIST_HOST', '0.0.0.0'), help='Bind-Adresse')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MNIST_PORT', '5000')), help='Port')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print(f"🚀 Async Backend (aiohttp) auf {args.host}:{args.port}")
+    print(f"   Backend: {serving.BACKEND}, Dekodier-Threads: {DECODE_THREADS}")
+    print("=" * 60)
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
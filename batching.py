@@ -0,0 +1,135 @@
+"""
+Dynamisches Micro-Batching für die Inferenz
+Sammelt einzelne /predict-Anfragen für ein kurzes Zeitfenster (oder bis die
+maximale Batchgröße erreicht ist) und führt sie als einen Forward-Pass aus.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Bündelt Einzelbilder (28, 28, 1) zu Batches (N, 28, 28, 1) für predict_fn"""
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=2.0, sample_window=2048):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._sample_window = sample_window
+        self._init_state()
+        # Worker-Threads überleben kein fork() (z.B. gunicorn --preload)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._init_state)
+
+    def _init_state(self):
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._worker = None
+        self._closed = False
+        # Statistiken
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+        self._histogram = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_samples = deque(maxlen=self._sample_window)
+
+    def submit(self, sample):
+        """Reiht ein Bild ein und gibt ein Future mit dessen Wahrscheinlichkeiten zurück"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Batcher ist geschlossen')
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+            self._queue.append((sample, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def predict(self, sample, timeout=None):
+        """Blockierende Variante von submit()"""
+        return self.submit(sample).result(timeout)
+
+    def close(self, timeout=None):
+        """Nimmt keine neuen Anfragen mehr an und arbeitet die Warteschlange ab"""
+        with self._cond:
+            self._closed = True
+            worker = self._worker
+            self._cond.notify_all()
+        if worker is not None:
+            worker.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # Zeitfenster beginnt mit der ältesten wartenden Anfrage
+                deadline = self._queue[0][2] + self.max_wait
+                while len(self._queue) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                n = min(len(self._queue), self.max_batch_size)
+                items = [self._queue.popleft() for _ in range(n)]
+            self._execute(items)
+
+    def _execute(self, items):
+        items = [item for item in items if item[1].set_running_or_notify_cancel()]
+        if not items:
+            return
+        start = time.perf_counter()
+        try:
+            batch = np.stack([sample for sample, _, _ in items])
+            probabilities = self.predict_fn(batch)
+        except Exception as e:
+            for _, future, _ in items:
+                future.set_exception(e)
+            failed = True
+        else:
+            for row, (_, future, _) in zip(probabilities, items):
+                future.set_result(row)
+            failed = False
+
+        waits = [start - enqueued for _, _, enqueued in items]
+        with self._cond:
+            n = len(items)
+            self._batches += 1
+            self._requests += n
+            self._errors += n if failed else 0
+            self._histogram[n] = self._histogram.get(n, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._wait_samples.extend(waits)
+
+    def stats(self):
+        """Kennzahlen zum Tuning von Durchsatz vs. p99-Latenz"""
+        with self._cond:
+            samples = np.array(self._wait_samples) * 1000.0
+            requests = self._requests
+            stats = {
+                'queue_depth': len(self._queue),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'requests': requests,
+                'errors': self._errors,
+                'avg_batch_size': requests / self._batches if self._batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._histogram.items())},
+                'wait_ms': {
+                    'avg': self._wait_total * 1000.0 / requests if requests else 0.0,
+                    'p50': float(np.percentile(samples, 50)) if samples.size else 0.0,
+                    'p99': float(np.percentile(samples, 99)) if samples.size else 0.0,
+                    'max': self._wait_max * 1000.0,
+                },
+            }
+        return stats
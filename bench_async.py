@@ -0,0 +1,173 @@
+"""
+Lasttest: Flask (serve.py, Threads) vs. aiohttp (app_async.py, Event-Loop)
+Geschlossene Last mit steigender Parallelität; optional ein Anteil langsamer Clients,
+die ihren Upload über mehrere Chunks strecken (typisch für mobile Verbindungen).
+Ausgegeben werden Durchsatz und p50/p99 der normalen Requests sowie die höchste
+Parallelität, bei der das p99-Ziel noch eingehalten wird.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+import numpy as np
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '0.0.0.0')
+SERVERS = {
+    'flask': [sys.executable, os.path.join(HERE, 'serve.py'), '--workers', '1'],
+    'async': [sys.executable, os.path.join(HERE, 'app_async.py')],
+}
+
+
+def make_payloads(n, seed=0):
+    """n verschiedene 28x28-Zufallsbilder als Base64-JSON-Body"""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(n):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (28, 28), dtype=np.uint8), mode='L').save(buffer, format='PNG')
+        image = 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('utf-8')
+        payloads.append(('{"image": "%s"}' % image).encode('utf-8'))
+    return payloads
+
+
+async def slow_body(body, chunks, delay):
+    # Upload in Stücken mit Pausen, wie ein Client mit schlechter Verbindung
+    size = -(-len(body) // chunks)
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+        await asyncio.sleep(delay)
+
+
+async def client_loop(session, url, payloads, deadline, latencies, errors, slow=None):
+    i = 0
+    headers = {'Content-Type': 'application/json'}
+    while time.perf_counter() < deadline:
+        body = payloads[i % len(payloads)]
+        i += 1
+        data = slow_body(body, *slow) if slow else body
+        start = time.perf_counter()
+        try:
+            async with session.post(url, data=data, headers=headers) as response:
+                await response.read()
+                ok = response.status == 200
+        except aiohttp.ClientError:
+            ok = False
+        if slow:
+            continue
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        else:
+            errors.append(1)
+
+
+async def run_level(base_url, concurrency, duration, payloads, slow_clients, slow):
+    """Eine Laststufe: concurrency normale Clients (+ slow_clients langsame) für duration Sekunden"""
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.perf_counter() + duration
+        tasks = [client_loop(session, base_url + '/predict', payloads, deadline, latencies, errors)
+                 for _ in range(concurrency)]
+        tasks += [client_loop(session, base_url + '/predict', payloads, deadline, [], [], slow)
+                  for _ in range(slow_clients)]
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50': float(np.percentile(latencies, 50)) if latencies else float('nan'),
+        'p99': float(np.percentile(latencies, 99)) if latencies else float('nan'),
+    }
+
+
+async def wait_ready(base_url, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            try:
+                async with session.get(base_url + '/health') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Server unter {base_url} nicht erreichbar")
+
+
+def local_port(url):
+    """Port für --start aus der URL (ohne Angabe 80 bzw. 443); nur lokale Hosts"""
+    parts = urlsplit(url)
+    if parts.hostname not in LOCAL_HOSTS:
+        raise SystemExit(f"--start startet nur lokal, {url} zeigt auf {parts.hostname or '?'}")
+    return parts.port or (443 if parts.scheme == 'https' else 80)
+
+
+def bench_server(name, base_url, args, payloads):
+    print(f"\n{name} ({base_url})")
+    print(f"{'Parallel':>9}{'Req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'Fehler':>8}")
+    rows = []
+    for concurrency in args.concurrency:
+        row = asyncio.run(run_level(base_url, concurrency, args.duration, payloads,
+                                    args.slow_clients, (args.slow_chunks, args.slow_delay_ms / 1000.0)))
+        rows.append(row)
+        print(f"{concurrency:9d}{row['rps']:10.0f}{row['p50']:10.1f}{row['p99']:10.1f}{row['errors']:8d}")
+    within = [row['concurrency'] for row in rows if row['p99'] <= args.p99_target and not row['errors']]
+    return max(within) if within else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest Flask vs. asynchrones Backend")
+    parser.add_argument('--flask-url', default='http://127.0.0.1:5001', help='URL des Flask-Servers')
+    parser.add_argument('--async-url', default='http://127.0.0.1:5002', help='URL des Async-Servers')
+    parser.add_argument('--start', action='store_true', help='Beide Server selbst starten (Ports aus den URLs)')
+    parser.add_argument('--threads', type=int, default=8, help='Threads des Flask-Servers bei --start')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32, 64, 128])
+    parser.add_argument('--duration', type=float, default=5.0, help='Sekunden pro Laststufe')
+    parser.add_argument('--p99-target', type=float, default=100.0, help='p99-Ziel in ms')
+    parser.add_argument('--slow-clients', type=int, default=0, help='Zusätzliche langsame Upload-Clients')
+    parser.add_argument('--slow-chunks', type=int, default=10, help='Chunks pro langsamem Upload')
+    parser.add_argument('--slow-delay-ms', type=float, default=100.0, help='Pause zwischen den Chunks')
+    args = parser.parse_args()
+
+    payloads = make_payloads(64)
+    targets = [('flask', args.flask_url.rstrip('/')), ('async', args.async_url.rstrip('/'))]
+    processes = []
+    try:
+        if args.start:
+            for name, url in targets:
+                command = SERVERS[name] + ['--port', str(local_port(url))]
+                if name == 'flask':
+                    command += ['--threads', str(args.threads)]
+                # Modelle werden relativ zum aktuellen Verzeichnis geladen (wie beim direkten Start)
+                processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        for _, url in targets:
+            asyncio.run(wait_ready(url))
+
+        print("=" * 60)
+        print(f"Lasttest /predict ({args.duration:.0f} s pro Stufe, {args.slow_clients} langsame Clients)")
+        print("=" * 60)
+        best = {name: bench_server(name, url, args, payloads) for name, url in targets}
+        print(f"\nHöchste Parallelität mit p99 <= {args.p99_target:.0f} ms:")
+        for name, concurrency in best.items():
+            print(f"   {name:6}: {concurrency}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(30)
+
+
+if __name__ == '__main__':
+    main()
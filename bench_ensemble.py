@@ -0,0 +1,107 @@
+"""
+Benchmark: Einzelmodell vs. TTA vs. Ensemble (konfidenz-gesteuert und immer) auf dem MNIST-Testset
+Pro Modus: Accuracy, Anteil eskalierter Bilder, Durchsatz (ganzes Testset) und
+Latenz pro Einzelbild wie bei /predict ohne Batching (Mittel, p50, p99).
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import mnist
+from ensemble import IDENTITY, EnsembleEngine, tta_transforms
+from inference import load_engine
+from model_registry import ModelRegistry
+
+
+def newest_versions(directory, count):
+    """Pfade der count neuesten .keras-Versionen (neueste zuerst)"""
+    registry = ModelRegistry('keras', load_fn=None, directory=directory)
+    return [info['path'] for info in registry.versions()[::-1][:count]]
+
+
+def evaluate(engine, x_test, y_test, latency_samples, chunk=1000):
+    start = time.perf_counter()
+    probabilities = np.concatenate([engine.predict(x_test[i:i + chunk]) for i in range(0, len(x_test), chunk)])
+    seconds = time.perf_counter() - start
+    accuracy = float((probabilities.argmax(axis=1) == y_test).mean())
+    escalation_rate = engine.stats()['escalation_rate']
+
+    latencies = []
+    for i in range(latency_samples):
+        start = time.perf_counter()
+        engine.predict(x_test[i:i + 1])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return {
+        'accuracy': accuracy,
+        'escalation_rate': escalation_rate,
+        'images_per_sec': len(x_test) / seconds,
+        'latency_ms': {
+            'mean': float(np.mean(latencies)),
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy und Latenz von TTA/Ensemble auf dem MNIST-Testset")
+    parser.add_argument('--models', default=None,
+                        help='.keras-Modelle, kommagetrennt, das erste ist das Primärmodell '
+                             '(Standard: die neuesten Versionen in --model-dir)')
+    parser.add_argument('--model-dir', default='.', help='Verzeichnis mit zeitgestempelten Modellen')
+    parser.add_argument('--size', type=int, default=3, help='Modelle im Ensemble inkl. Primärmodell')
+    parser.add_argument('--threshold', type=float, default=0.9, help='Eskalation bei confidence < Schwelle')
+    parser.add_argument('--samples', type=int, default=None, help='Nur die ersten N Testbilder')
+    parser.add_argument('--latency-samples', type=int, default=300, help='Einzelbild-Aufrufe für die Latenz')
+    parser.add_argument('--json', default=None, help='Ergebnisse zusätzlich als JSON speichern')
+    args = parser.parse_args()
+
+    paths = args.models.split(',') if args.models else newest_versions(args.model_dir, args.size)
+    if not paths:
+        parser.error(f"Keine Modellversionen in {args.model_dir} (NN_Model.py ausführen oder --models angeben)")
+    x_test, y_test = mnist.load('test', 'float32')
+    if args.samples:
+        x_test, y_test = x_test[:args.samples], y_test[:args.samples]
+
+    print(f"Lade {len(paths)} Modelle...")
+    engines = [load_engine(path) for path in paths]
+    primary, members = engines[0], engines[1:]
+    for path in paths:
+        print(f"   {os.path.basename(path)}")
+
+    tta = tta_transforms()
+    modes = [('Einzelmodell', [], IDENTITY, args.threshold)]
+    modes += [(f'TTA ({len(tta)} Varianten)', [], tta, threshold) for threshold in (args.threshold, 1.0)]
+    if members:
+        modes += [(f'Ensemble ({len(engines)} Modelle)', members, IDENTITY, threshold)
+                  for threshold in (args.threshold, 1.0)]
+        modes += [('Ensemble + TTA', members, tta, threshold) for threshold in (args.threshold, 1.0)]
+
+    results = []
+    print("\n" + "=" * 96)
+    print(f"{'Modus':28} {'Eskalation':>10} {'Accuracy':>9} {'Bilder/s':>9} {'Mittel':>9} {'p50':>9} {'p99':>9}")
+    print("=" * 96)
+    for name, mode_members, transforms, threshold in modes:
+        engine = EnsembleEngine(primary, mode_members, transforms, threshold)
+        gate = 'immer' if threshold >= 1.0 else f'< {threshold}'
+        if not mode_members and transforms == IDENTITY:
+            gate = '-'
+        result = {'mode': name, 'gate': gate, **evaluate(engine, x_test, y_test, args.latency_samples)}
+        results.append(result)
+        latency = result['latency_ms']
+        print(f"{name + ' ' + gate:28} {result['escalation_rate']:10.1%} {result['accuracy']:9.2%} "
+              f"{result['images_per_sec']:9.0f} {latency['mean']:6.2f} ms {latency['p50']:6.2f} ms "
+              f"{latency['p99']:6.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'models': paths, 'threshold': args.threshold, 'test_samples': len(y_test),
+                       'results': results}, f, indent=2)
+        print(f"\n✓ Ergebnisse gespeichert: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: Keras model.predict vs. InferenceEngine (kompilierte, vorgewärmte Buckets)
+Gibt Startzeit und Latenz pro Bucket vorher/nachher aus.
+"""
+import argparse
+import time
+
+import numpy as np
+from tensorflow import keras
+
+from inference import DEFAULT_BUCKETS, load_engine
+
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model.predict vs. InferenceEngine")
+    parser.add_argument('--model', default='mnist_model.keras', help='Pfad zum .keras Modell')
+    parser.add_argument('--buckets', default=','.join(str(b) for b in DEFAULT_BUCKETS), help='Batchgrößen, kommagetrennt')
+    parser.add_argument('--repeats', type=int, default=50, help='Wiederholungen pro Messung')
+    parser.add_argument('--xla', action='store_true', help='XLA JIT-Kompilierung aktivieren')
+    args = parser.parse_args()
+    buckets = tuple(int(b) for b in args.buckets.split(','))
+
+    start = time.perf_counter()
+    model = keras.models.load_model(args.model, compile=False)
+    keras_load_ms = (time.perf_counter() - start) * 1000.0
+
+    engine = load_engine(args.model, buckets=buckets, jit_compile=args.xla)
+    startup = engine.startup
+
+    print("=" * 60)
+    print("Startzeit")
+    print("=" * 60)
+    print(f"Keras load_model:            {keras_load_ms:8.0f} ms")
+    print(f"Engine laden:                {startup['load_ms']:8.0f} ms")
+    print(f"Engine Tracing:              {startup['trace_ms']:8.0f} ms")
+    print(f"Engine Warm-up:              {startup['warmup_ms']:8.0f} ms")
+    print(f"Engine gesamt:               {startup['total_ms']:8.0f} ms")
+
+    print("\n" + "=" * 60)
+    print("Latenz pro Bucket (Median)")
+    print("=" * 60)
+    print(f"{'Batch':>6} {'predict kalt':>13} {'predict':>10} {'Engine':>10} {'Speedup':>8}")
+    rng = np.random.default_rng(0)
+    for b in buckets:
+        x = rng.random((b, 28, 28, 1), dtype=np.float32)
+        start = time.perf_counter()
+        model.predict(x, verbose=0)
+        cold_ms = (time.perf_counter() - start) * 1000.0
+        keras_ms = median_ms(lambda: model.predict(x, verbose=0), args.repeats)
+        engine_ms = median_ms(lambda: engine.predict(x), args.repeats)
+        print(f"{b:6d} {cold_ms:10.2f} ms {keras_ms:7.2f} ms {engine_ms:7.2f} ms {keras_ms / engine_ms:7.1f}x")
+
+    x = rng.random((max(buckets), 28, 28, 1), dtype=np.float32)
+    diff = np.abs(model.predict(x, verbose=0) - engine.predict(x)).max()
+    print(f"\nMax. Abweichung der Wahrscheinlichkeiten: {diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: Kosten der Metriken (metrics.py) pro Messung und pro /predict-Anfrage
+Vergleicht Stufen-Timer an/aus (MNIST_METRICS) im Mikro-Benchmark und über den
+kompletten Serving-Pfad (Dekodieren, Vorverarbeitung, Inferenz, Antwortaufbau).
+"""
+import argparse
+import io
+import os
+import time
+
+# Ohne Cache und ohne Sammelfenster der Batching-Queue, sonst misst der End-to-End-Teil
+# Cache-Treffer bzw. die Wartezeit statt der Verarbeitung
+os.environ.setdefault('MNIST_CACHE_MB', '0')
+os.environ.setdefault('MNIST_BATCH_WAIT_MS', '0')
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+
+def per_call_ns(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) * 1e9 / n
+
+
+def timed_stage():
+    with metrics.stage('bench'):
+        pass
+
+
+def make_images(n, seed=0):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (28, 28), dtype=np.uint8), mode='L').save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead der Metriken messen")
+    parser.add_argument('--calls', type=int, default=200000, help='Aufrufe im Mikro-Benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='Anfragen pro Runde im End-to-End-Teil')
+    parser.add_argument('--rounds', type=int, default=5, help='Runden (abwechselnd an/aus)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Mikro-Benchmark (pro Aufruf)")
+    print("=" * 60)
+    metrics.ENABLED = False
+    off_ns = per_call_ns(timed_stage, args.calls)
+    metrics.ENABLED = True
+    on_ns = per_call_ns(timed_stage, args.calls)
+    record_ns = per_call_ns(lambda: metrics.record_request('/bench', 200, 0.001), args.calls)
+    print(f"Stufen-Timer aus:      {off_ns:8.0f} ns")
+    print(f"Stufen-Timer an:       {on_ns:8.0f} ns")
+    print(f"record_request:        {record_ns:8.0f} ns")
+
+    import serving
+    serving.start()
+    if serving.engine is None:
+        raise SystemExit("Kein Modell geladen - End-to-End-Teil übersprungen")
+
+    # Jede Anfrage durchläuft decode, preprocess, inference, serialize und record_request
+    images = make_images(args.requests)
+
+    def serve_all():
+        start = time.perf_counter()
+        for image_bytes in images:
+            request_start = time.perf_counter()
+            probabilities, _ = serving.classify_image_bytes(image_bytes)
+            with metrics.stage('serialize'):
+                serving.prediction_result(probabilities)
+            metrics.record_request('/predict', 200, time.perf_counter() - request_start)
+        return (time.perf_counter() - start) * 1e6 / len(images)
+
+    serve_all()  # Aufwärmen
+    results = {True: [], False: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            metrics.ENABLED = enabled
+            results[enabled].append(serve_all())
+    metrics.ENABLED = True
+    serving.shutdown()
+
+    off_us = float(np.median(results[False]))
+    on_us = float(np.median(results[True]))
+    print("\n" + "=" * 60)
+    print(f"Serving-Pfad ({args.requests} Anfragen x {args.rounds} Runden, Median pro Anfrage)")
+    print("=" * 60)
+    print(f"Metriken aus:          {off_us:8.1f} µs")
+    print(f"Metriken an:           {on_us:8.1f} µs")
+    print(f"Overhead:              {on_us - off_us:8.1f} µs ({(on_us - off_us) / off_us:+.2%})")
+    # Rechnerische Untergrenze: 4-5 Messungen à (an - aus) plus record_request
+    print(f"Erwartet aus Mikro:    {(5 * (on_ns - off_ns) + record_ns) / 1000.0:8.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: Vorverarbeitung pro Bild (PIL, alter predict()-Pfad) vs. vektorisiert (preprocessing.py)
+Misst Bilder/Sekunde auf synthetischen Canvas-Bildern (schwarze Ziffernstriche auf weißem Grund).
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from preprocessing import image_to_array, preprocess_batch
+
+
+def make_canvas_images(n, size, mode, seed=0):
+    """Erzeugt n zufällige 'gezeichnete' Bilder wie vom Frontend-Canvas"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        img = Image.new('RGB', (size, size), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for _ in range(3):
+            x0, y0, x1, y1 = (int(v) for v in rng.integers(size // 5, size - size // 5, 4))
+            draw.line((x0, y0, x1, y1), fill=(0, 0, 0), width=max(1, size // 15))
+        img = img.convert(mode)
+        img.load()
+        images.append(img)
+    return images
+
+
+def legacy_preprocess(image):
+    """Bisherige Einzelbild-Vorverarbeitung aus app.predict()"""
+    image = image.convert('L')
+    image = image.resize((28, 28), Image.Resampling.LANCZOS)
+    img_array = np.array(image)
+    if np.mean(img_array) > 127:
+        img_array = 255 - img_array
+    img_array = img_array.astype('float32') / 255.0
+    img_array = np.expand_dims(img_array, axis=0)
+    img_array = np.expand_dims(img_array, axis=-1)
+    return img_array
+
+
+def bench(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Bildvorverarbeitung")
+    parser.add_argument('--n', type=int, default=512, help='Anzahl Bilder')
+    parser.add_argument('--size', type=int, default=280, help='Kantenlänge der Canvas-Bilder')
+    parser.add_argument('--mode', choices=['L', 'RGB', 'RGBA'], default='RGBA', help='Bildmodus')
+    parser.add_argument('--repeats', type=int, default=5, help='Wiederholungen (bester Lauf zählt)')
+    args = parser.parse_args()
+
+    images = make_canvas_images(args.n, args.size, args.mode)
+    arrays = np.stack([image_to_array(img) for img in images])
+    out = np.empty((args.n, 28, 28, 1), dtype=np.float32)
+
+    t_legacy, legacy = bench(lambda: np.concatenate([legacy_preprocess(img) for img in images]), args.repeats)
+    t_vec, vec = bench(lambda: preprocess_batch(arrays, out=out), args.repeats)
+    t_vec_pil, _ = bench(lambda: preprocess_batch([image_to_array(img) for img in images]), args.repeats)
+
+    print("=" * 60)
+    print(f"Vorverarbeitung: {args.n} Bilder {args.size}x{args.size} ({args.mode})")
+    print("=" * 60)
+    print(f"PIL pro Bild (alt):               {args.n / t_legacy:10.0f} Bilder/s")
+    print(f"Vektorisiert (Array-Stack):       {args.n / t_vec:10.0f} Bilder/s  ({t_legacy / t_vec:.1f}x)")
+    print(f"Vektorisiert (inkl. np.asarray):  {args.n / t_vec_pil:10.0f} Bilder/s  ({t_legacy / t_vec_pil:.1f}x)")
+    print(f"Max. Abweichung zum alten Pfad:   {np.abs(legacy - vec).max() * 255:.2f} Graustufen")
+
+
+if __name__ == '__main__':
+    main()
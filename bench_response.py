@@ -0,0 +1,71 @@
+"""
+Benchmark: Antwortgröße und Latenz von /predict je Antwortformat
+Vergleicht Standard (all_probabilities-Dict), Debug (+ processed_image PNG) und kompakt
+(probabilities-Liste). Läuft in-process über den Flask-Testclient, ohne Server.
+"""
+import argparse
+import base64
+import io
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+VARIANTS = [
+    ('debug (bisheriger Standard)', '?debug=1'),
+    ('standard', ''),
+    ('kompakt', '?format=compact'),
+]
+
+
+def make_payloads(n, seed=0):
+    """n verschiedene 28x28-Zufallsbilder als Base64-JSON"""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(n):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (28, 28), dtype=np.uint8), mode='L').save(buffer, format='PNG')
+        payloads.append({'image': 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('utf-8')})
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der /predict Antwortformate")
+    parser.add_argument('--n', type=int, default=200, help='Requests pro Variante')
+    args = parser.parse_args()
+
+    # Sequentielle Requests: kein Batching-Zeitfenster, damit nur das Antwortformat zählt
+    os.environ.setdefault('MNIST_BATCH_WAIT_MS', '0')
+    import app as backend
+    if backend.serving.engine is None:
+        raise SystemExit("Modell nicht geladen")
+    client = backend.app.test_client()
+    payloads = make_payloads(args.n)
+
+    print("=" * 60)
+    print(f"/predict Antwortformate ({args.n} Requests je Variante)")
+    print("=" * 60)
+    print(f"{'Variante':30}{'Bytes':>8}{'p50 ms':>9}{'p99 ms':>9}{'Mittel ms':>11}")
+    baseline = None
+    for name, query in VARIANTS:
+        # Cache leeren, damit jede Variante dieselbe Arbeit (Dekodieren + Inferenz) leistet
+        backend.serving.cache.clear()
+        times, sizes = [], []
+        for payload in payloads:
+            start = time.perf_counter()
+            response = client.post(f'/predict{query}', json=payload)
+            times.append((time.perf_counter() - start) * 1000.0)
+            sizes.append(len(response.get_data()))
+            if response.status_code != 200:
+                raise SystemExit(f"Fehler {response.status_code}: {response.get_data(as_text=True)}")
+        size, mean = float(np.mean(sizes)), float(np.mean(times))
+        print(f"{name:30}{size:8.0f}{np.percentile(times, 50):9.2f}{np.percentile(times, 99):9.2f}{mean:11.2f}")
+        if baseline is None:
+            baseline = (size, mean)
+        else:
+            print(f"{'':30}{'-' + format(1 - size / baseline[0], '.0%'):>8}{'':18}{'-' + format(1 - mean / baseline[1], '.0%'):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: Startzeit des Backends, sofortiger vs. verzögerter Start (MNIST_LAZY_STARTUP)
+Startet serve.py mit einem Worker und fragt /health im Abstand von --poll-ms ab. Gemessen werden
+die Zeit bis zur ersten Antwort (Port gebunden, Liveness) und bis /health 200 liefert (Readiness).
+Danach wird der Start-Trace des Backends (Importe, Laden, Warm-up) ausgegeben.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(port, lazy, backend, poll_ms, timeout):
+    env = dict(os.environ, MNIST_LAZY_STARTUP='1' if lazy else '0')
+    if backend:
+        env['MNIST_BACKEND'] = backend
+    command = [sys.executable, os.path.join(HERE, 'serve.py'), '--port', str(port), '--workers', '1']
+    url = f'http://127.0.0.1:{port}/health'
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_response = ready = None
+    health = {}
+    states = []
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = requests.get(url, timeout=2)
+            except requests.RequestException:
+                time.sleep(poll_ms / 1000.0)
+                continue
+            now = (time.perf_counter() - start) * 1000.0
+            health = response.json()
+            if first_response is None:
+                first_response = now
+            state = health.get('startup', {}).get('state')
+            if not states or states[-1][0] != state:
+                states.append((state, now))
+            if response.status_code == 200:
+                ready = now
+                break
+            time.sleep(poll_ms / 1000.0)
+    finally:
+        # Abgebrochene Abfragen aus der Ladephase halten sonst den graceful Shutdown auf
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {'lazy': lazy, 'first_response_ms': first_response, 'ready_ms': ready,
+            'states': states, 'trace': health.get('startup')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Misst Bind- und Bereitschaftszeit des Backends")
+    parser.add_argument('--port', type=int, default=5055, help='Port für den ersten Testserver (der zweite nutzt Port + 1)')
+    parser.add_argument('--backend', choices=['keras', 'numpy', 'tflite'], default=None, help='MNIST_BACKEND')
+    parser.add_argument('--poll-ms', type=float, default=20.0, help='Abstand der /health-Abfragen')
+    parser.add_argument('--timeout', type=float, default=180.0, help='Maximale Wartezeit pro Start in Sekunden')
+    parser.add_argument('--json', default=None, help='Ergebnisse zusätzlich als JSON speichern')
+    args = parser.parse_args()
+
+    results = []
+    for i, lazy in enumerate((False, True)):
+        # Eigener Port pro Lauf: der vorige Server kann ihn beim Beenden noch kurz belegen
+        result = measure(args.port + i, lazy, args.backend, args.poll_ms, args.timeout)
+        results.append(result)
+        first = result['first_response_ms']
+        ready = result['ready_ms']
+        print("=" * 70)
+        print(f"{'Verzögerter' if lazy else 'Sofortiger'} Start (MNIST_LAZY_STARTUP={int(lazy)})")
+        print("=" * 70)
+        print(f"Erste Antwort auf /health: {first:8.0f} ms" if first is not None else "Erste Antwort: -")
+        print(f"Bereit (/health 200):      {ready:8.0f} ms" if ready is not None else "Nicht bereit (Timeout)")
+        if lazy:
+            print("Beobachtete Zustände: " + ", ".join(f"{state} ({ms:.0f} ms)" for state, ms in result['states']))
+        trace = result['trace'] or {}
+        for phase in trace.get('phases', []):
+            print(f"   {phase['start_ms']:8.0f} ms  {phase['phase']:40} {phase['ms']:8.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Ergebnisse gespeichert: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+tf.data Eingabe-Pipeline für NN_Model.py
+Die Bilder bleiben bis zum Batching uint8 (1/4 des Speichers von float32). Normalisierung
+und Augmentation laufen pro Batch als paralleles map() statt single-threaded in Python
+(ImageDataGenerator); cache(), shuffle() und prefetch() halten die CPU-Kerne ausgelastet.
+"""
+import json
+import time
+
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def make_augmenter(rotation=10, shift=0.1, zoom=0.1, seed=None):
+    """Entspricht ImageDataGenerator(rotation_range, width/height_shift_range, zoom_range)"""
+    return keras.Sequential([
+        # RandomRotation erwartet einen Anteil einer vollen Drehung, nicht Grad
+        layers.RandomRotation(rotation / 360.0, fill_mode='nearest', seed=seed),
+        layers.RandomTranslation(shift, shift, fill_mode='nearest', seed=seed),
+        # ImageDataGenerator zoomt beide Achsen unabhängig im Bereich [1 - zoom, 1 + zoom]
+        layers.RandomZoom((-zoom, zoom), (-zoom, zoom), fill_mode='nearest', seed=seed),
+    ], name='augmentation')
+
+
+def make_dataset(x, y, batch_size, training=False, augment=False, shuffle_buffer=10000, seed=None):
+    """
+    uint8-Bilder (N, 28, 28[, 1]) + Labels -> tf.data.Dataset mit float32-Batches in [0, 1].
+
+    training: mischen (pro Epoche neu); augment: zufällige Rotation/Verschiebung/Zoom
+    (nur für Bilder mit Kanal-Dimension, d.h. CNN).
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((x, y)).cache()
+    if training:
+        dataset = dataset.shuffle(min(shuffle_buffer, len(x)), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+
+    augmenter = make_augmenter(seed=seed) if augment else None
+
+    def to_float(images, labels):
+        images = tf.cast(images, tf.float32) / 255.0
+        if augmenter is not None:
+            images = augmenter(images, training=True)
+        return images, labels
+
+    return dataset.map(to_float, num_parallel_calls=AUTOTUNE, deterministic=not training).prefetch(AUTOTUNE)
+
+
+class EpochTimer(keras.callbacks.Callback):
+    """Protokolliert Dauer, Schritte/s und Bilder/s jeder Epoche über log_fn (optional als JSONL)"""
+
+    def __init__(self, log_fn=print, batch_size=None, jsonl_path=None):
+        super().__init__()
+        self.log_fn = log_fn
+        self.batch_size = batch_size
+        self.jsonl_path = jsonl_path
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._steps = 0
+        self._start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        entry = {'epoch': epoch + 1, 'seconds': seconds, 'steps': self._steps,
+                 'steps_per_sec': self._steps / seconds if seconds else 0.0}
+        message = f"Epoche {epoch + 1}: {seconds:.1f} s, {entry['steps_per_sec']:.1f} Schritte/s"
+        if self.batch_size:
+            entry['images_per_sec'] = entry['steps_per_sec'] * self.batch_size
+            message += f", ~{entry['images_per_sec']:.0f} Bilder/s"
+        self.epochs.append(entry)
+        self.log_fn(message)
+        if self.jsonl_path:
+            # Eine Zeile pro Epoche inkl. Keras-Metriken, z.B. für sweep.py
+            metrics = {name: float(value) for name, value in (logs or {}).items()}
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({**entry, **metrics}) + '\n')
+
+    def summary(self):
+        """Mittelwerte ohne die erste Epoche (Tracing/Kompilierung), sofern es mehrere gibt"""
+        epochs = self.epochs[1:] if len(self.epochs) > 1 else self.epochs
+        if not epochs:
+            return None
+        result = {
+            'from_epoch': epochs[0]['epoch'],
+            'seconds': sum(e['seconds'] for e in epochs) / len(epochs),
+            'steps_per_sec': sum(e['steps_per_sec'] for e in epochs) / len(epochs),
+        }
+        if self.batch_size:
+            result['images_per_sec'] = result['steps_per_sec'] * self.batch_size
+        return result
@@ -0,0 +1,135 @@
+"""
+Konfidenz-gesteuertes Ensemble mit Test-Time-Augmentation (TTA)
+Das Primärmodell rechnet jeden Batch; nur Bilder mit confidence < threshold werden
+zusätzlich mit verschobenen/gedrehten Varianten und weiteren Modellversionen bewertet.
+Alle Varianten eines Bildes laufen pro Modell in einem gemeinsamen Forward-Pass,
+das Ergebnis ist der Mittelwert aller Wahrscheinlichkeiten.
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from preprocessing import TARGET_SIZE
+
+# (dy, dx, Winkel in Grad); die Identität steht immer an erster Stelle
+IDENTITY = ((0, 0, 0.0),)
+TTA_SHIFTS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+TTA_ANGLES = (-10.0, 10.0)
+
+
+def tta_transforms(shifts=TTA_SHIFTS, angles=TTA_ANGLES):
+    """Identität + Verschiebungen um ganze Pixel + Drehungen um die Bildmitte"""
+    return IDENTITY + tuple((dy, dx, 0.0) for dy, dx in shifts) + tuple((0, 0, float(a)) for a in angles)
+
+
+@lru_cache(maxsize=8)
+def tta_matrix(transforms, size=TARGET_SIZE):
+    """
+    Bilineare Abtastung aller Varianten als eine Matrix (V * size², size²)
+
+    Zeile v * size² + i ist Ausgabepixel i der Variante v; Pixel außerhalb des Bildes
+    zählen als Hintergrund (0). Ganze Verschiebungen ohne Drehung sind exakt.
+    """
+    n = size * size
+    center = (size - 1) / 2.0
+    rows, cols = np.mgrid[0:size, 0:size].astype(np.float64)
+    out_index = np.arange(n).reshape(size, size)
+    matrix = np.zeros((len(transforms), n, n), dtype=np.float32)
+    for v, (dy, dx, angle) in enumerate(transforms):
+        theta = np.deg2rad(angle)
+        cos, sin = np.cos(theta), np.sin(theta)
+        # Inverse Abbildung: Ausgabepixel -> Quellkoordinate
+        y = rows - center - dy
+        x = cols - center - dx
+        src_y = cos * y - sin * x + center
+        src_x = sin * y + cos * x + center
+        y0, x0 = np.floor(src_y), np.floor(src_x)
+        fy, fx = src_y - y0, src_x - x0
+        for oy, ox, weight in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                               (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            sy = (y0 + oy).astype(np.int64)
+            sx = (x0 + ox).astype(np.int64)
+            valid = (sy >= 0) & (sy < size) & (sx >= 0) & (sx < size) & (weight > 0)
+            np.add.at(matrix[v], (out_index[valid], (sy * size + sx)[valid]), weight[valid])
+    return matrix.reshape(len(transforms) * n, n)
+
+
+def augment(batch, transforms):
+    """(N, 28, 28[, 1]) -> (N * V, 28, 28, 1), Varianten eines Bildes hintereinander"""
+    batch = np.asarray(batch, dtype=np.float32)
+    n = len(batch)
+    flat = batch.reshape(n, TARGET_SIZE * TARGET_SIZE)
+    if transforms == IDENTITY:
+        return flat.reshape(n, TARGET_SIZE, TARGET_SIZE, 1)
+    # Eine Matrixmultiplikation für alle Varianten aller Bilder
+    variants = flat @ tta_matrix(tuple(transforms)).T
+    return variants.reshape(n * len(transforms), TARGET_SIZE, TARGET_SIZE, 1)
+
+
+class EnsembleEngine:
+    """
+    Engine-Hülle mit derselben Schnittstelle wie InferenceEngine (predict, buckets, startup)
+
+    members: weitere Engines (z.B. ältere Modellversionen); transforms: TTA-Varianten
+    (IDENTITY = keine Augmentation); threshold >= 1.0 bewertet jedes Bild mit dem Ensemble.
+    """
+
+    def __init__(self, primary, members=(), transforms=IDENTITY, threshold=0.9):
+        self.primary = primary
+        self.members = list(members)
+        self.transforms = tuple(transforms)
+        self.threshold = float(threshold)
+        self.buckets = primary.buckets
+        self.warmup_ms = primary.warmup_ms
+        self.num_classes = primary.num_classes
+        self.startup = dict(primary.startup)
+        self.startup['ensemble_members'] = [member.startup for member in self.members]
+        self._lock = threading.Lock()
+        self._predictions = 0
+        self._escalated = 0
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        probabilities = self.primary.predict(batch)
+        if not self.members and self.transforms == IDENTITY:
+            rows = ()
+        elif self.threshold >= 1.0:
+            rows = np.arange(len(batch))
+        else:
+            rows = np.flatnonzero(probabilities.max(axis=1) < self.threshold)
+        if len(rows):
+            probabilities[rows] = self.combine(batch[rows], probabilities[rows])
+        with self._lock:
+            self._predictions += len(batch)
+            self._escalated += len(rows)
+        return probabilities
+
+    def combine(self, batch, primary_probabilities):
+        """Mittelwert über Primärmodell, Zusatzmodelle und alle TTA-Varianten"""
+        n, v = len(batch), len(self.transforms)
+        variants = augment(batch, self.transforms)
+        total = primary_probabilities.astype(np.float32)
+        count = 1
+        if v > 1:
+            # Identität hat das Primärmodell schon gerechnet
+            rest = variants.reshape(n, v, TARGET_SIZE, TARGET_SIZE, 1)[:, 1:]
+            total += self.primary.predict(rest.reshape(n * (v - 1), TARGET_SIZE, TARGET_SIZE, 1)) \
+                .reshape(n, v - 1, -1).sum(axis=1)
+            count += v - 1
+        for member in self.members:
+            total += member.predict(variants).reshape(n, v, -1).sum(axis=1)
+            count += v
+        return total / count
+
+    def stats(self):
+        with self._lock:
+            predictions, escalated = self._predictions, self._escalated
+        return {
+            'members': [member.startup.get('path') for member in self.members],
+            'tta_variants': len(self.transforms),
+            'threshold': self.threshold,
+            'predictions': predictions,
+            'escalated': escalated,
+            'escalation_rate': escalated / predictions if predictions else 0.0,
+        }
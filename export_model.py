@@ -0,0 +1,176 @@
+"""
+Export eines trainierten Keras-Modells für numpy_runtime.py
+BatchNormalization wird in die benachbarten Conv2D/Dense-Gewichte gefaltet,
+Dropout entfällt. Anschließend Paritätstest gegen Keras auf dem MNIST-Testset.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras.datasets import mnist
+
+from numpy_runtime import load_numpy_model, save_numpy_model
+from preprocessing import preprocess_batch
+
+
+def _activation_name(layer):
+    name = getattr(layer.activation, '__name__', 'linear')
+    if name not in ('relu', 'softmax', 'linear'):
+        raise ValueError(f"Aktivierung '{name}' in {layer.name} wird nicht unterstützt")
+    return name
+
+
+def layers_to_ops(model):
+    """Übersetzt die Keras-Layer in eine Liste (op, gewichte) ohne Dropout"""
+    ops = []
+    for layer in model.layers:
+        if isinstance(layer, (keras.layers.InputLayer, keras.layers.Dropout)):
+            continue
+        if isinstance(layer, keras.layers.Conv2D):
+            if tuple(layer.dilation_rate) != (1, 1) or layer.groups != 1:
+                raise ValueError(f'{layer.name}: Dilation/Groups werden nicht unterstützt')
+            kernel, *rest = layer.get_weights()
+            op = {'type': 'conv2d', 'strides': list(layer.strides), 'padding': layer.padding,
+                  'activation': _activation_name(layer)}
+            ops.append((op, {'kernel': kernel, 'bias': rest[0] if rest else np.zeros(kernel.shape[-1])}))
+        elif isinstance(layer, keras.layers.Dense):
+            kernel, *rest = layer.get_weights()
+            op = {'type': 'dense', 'activation': _activation_name(layer)}
+            ops.append((op, {'kernel': kernel, 'bias': rest[0] if rest else np.zeros(kernel.shape[-1])}))
+        elif isinstance(layer, keras.layers.BatchNormalization):
+            params = dict(zip([w.name for w in layer.weights], layer.get_weights()))
+            mean, var = params['moving_mean'], params['moving_variance']
+            gamma = params.get('gamma', np.ones_like(mean))
+            beta = params.get('beta', np.zeros_like(mean))
+            scale = gamma / np.sqrt(var + layer.epsilon)
+            ops.append(({'type': 'affine'}, {'scale': scale, 'shift': beta - mean * scale}))
+        elif isinstance(layer, keras.layers.MaxPooling2D):
+            ops.append(({'type': 'maxpool', 'pool_size': list(layer.pool_size),
+                         'strides': list(layer.strides), 'padding': layer.padding}, {}))
+        elif isinstance(layer, keras.layers.Flatten):
+            ops.append(({'type': 'flatten'}, {}))
+        else:
+            raise ValueError(f'Layer-Typ {type(layer).__name__} ({layer.name}) wird nicht unterstützt')
+    return ops
+
+
+def _fold_into_previous(prev, scale, shift):
+    # y = a * (x W + b) + c  ->  W' = W * a, b' = b * a + c (nur ohne Aktivierung dazwischen)
+    prev['kernel'] = prev['kernel'] * scale
+    prev['bias'] = prev['bias'] * scale + shift
+
+
+def _fold_into_next(nxt_op, nxt, scale, shift):
+    # Nachfolger sieht a * x + c: Gewichte pro Eingangskanal skalieren, Bias um W·c erweitern
+    kernel = nxt['kernel']
+    if nxt_op['type'] == 'conv2d':
+        nxt['bias'] = nxt['bias'] + np.einsum('hwio,i->o', kernel, shift)
+        nxt['kernel'] = kernel * scale[:, None]
+    else:
+        # Dense nach Flatten: Kanal-Vektor über alle (H, W)-Positionen wiederholen (channels_last)
+        repeats = kernel.shape[0] // len(scale)
+        scale, shift = np.tile(scale, repeats), np.tile(shift, repeats)
+        nxt['bias'] = nxt['bias'] + shift @ kernel
+        nxt['kernel'] = kernel * scale[:, None]
+
+
+def fold_batchnorm(ops):
+    """Faltet jede BatchNorm (affine) in eine benachbarte Conv2D/Dense, wo das exakt möglich ist"""
+    result = []
+    folded = kept = 0
+    for i, (op, weights) in enumerate(ops):
+        if op['type'] != 'affine':
+            result.append((op, weights))
+            continue
+        scale, shift = weights['scale'], weights['shift']
+
+        # Fall 1: Conv/Dense ohne Aktivierung direkt davor
+        if result and result[-1][0]['type'] in ('conv2d', 'dense') and result[-1][0]['activation'] == 'linear':
+            _fold_into_previous(result[-1][1], scale, shift)
+            folded += 1
+            continue
+
+        # Fall 2: nächste Conv ('valid') bzw. Dense, dazwischen nur MaxPool (bei a > 0) oder Flatten
+        target = None
+        for nxt_op, nxt in ops[i + 1:]:
+            if nxt_op['type'] == 'maxpool' and np.all(scale > 0):
+                continue
+            if nxt_op['type'] == 'flatten':
+                continue
+            if (nxt_op['type'] == 'conv2d' and nxt_op['padding'] == 'valid') or nxt_op['type'] == 'dense':
+                target = (nxt_op, nxt)
+            break
+        if target is not None:
+            _fold_into_next(target[0], target[1], scale, shift)
+            folded += 1
+        else:
+            result.append((op, weights))
+            kept += 1
+    return result, folded, kept
+
+
+def op_weights(ops):
+    """Gewichte aller Operationen unter den Namen, die numpy_runtime erwartet (op<i>_<name>)"""
+    weights = {}
+    for i, (_, params) in enumerate(ops):
+        for name, value in params.items():
+            weights[f'op{i}_{name}'] = value
+    return weights
+
+
+def export_numpy(model, path):
+    """Schreibt das Modell als .npz für numpy_runtime; gibt (gefaltet, verbleibend) zurück"""
+    ops, folded, kept = fold_batchnorm(layers_to_ops(model))
+    save_numpy_model(path, [op for op, _ in ops], op_weights(ops), tuple(model.inputs[0].shape[1:]))
+    return folded, kept
+
+
+def verify_parity(model, path, atol=1e-4, batch_size=1024):
+    """Vergleicht Keras und NumPy-Runtime auf dem MNIST-Testset"""
+    (_, _), (x_test, y_test) = mnist.load_data()
+    x_test = preprocess_batch(x_test)
+    input_shape = tuple(model.inputs[0].shape[1:])
+    keras_probs = model.predict(x_test.reshape((-1,) + input_shape), batch_size=batch_size, verbose=0)
+
+    start = time.perf_counter()
+    numpy_model = load_numpy_model(path)
+    load_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    numpy_probs = numpy_model.predict(x_test)
+    predict_s = time.perf_counter() - start
+
+    max_diff = float(np.abs(keras_probs - numpy_probs).max())
+    keras_pred, numpy_pred = keras_probs.argmax(axis=1), numpy_probs.argmax(axis=1)
+    mismatches = int((keras_pred != numpy_pred).sum())
+    print(f"NumPy-Runtime geladen in {load_ms:.1f} ms, {len(x_test) / predict_s:.0f} Bilder/s")
+    print(f"Keras Accuracy: {(keras_pred == y_test).mean():.4f}, NumPy Accuracy: {(numpy_pred == y_test).mean():.4f}")
+    print(f"Argmax-Abweichungen: {mismatches}, max. Wahrscheinlichkeitsdifferenz: {max_diff:.2e} (Toleranz {atol:.0e})")
+    return mismatches == 0 and max_diff <= atol
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportiere Keras-Modell für die NumPy-Runtime")
+    parser.add_argument('model', nargs='?', default='mnist_model.keras', help='Pfad zum .keras Modell')
+    parser.add_argument('--output', default=None, help='Zieldatei (Standard: gleicher Name mit .npz)')
+    parser.add_argument('--no-verify', action='store_true', help='Paritätstest überspringen')
+    parser.add_argument('--atol', type=float, default=1e-4, help='Toleranz für Wahrscheinlichkeiten')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + '.npz'
+    model = keras.models.load_model(args.model, compile=False)
+    folded, kept = export_numpy(model, output)
+    print(f"✓ Exportiert: {output} ({os.path.getsize(output) / 1024:.0f} KB, "
+          f"BatchNorm gefaltet: {folded}, als Affine behalten: {kept})")
+
+    if args.no_verify:
+        return 0
+    ok = verify_parity(model, output, atol=args.atol)
+    print("✓ Parität bestätigt" if ok else "✗ Parität verletzt")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Prozessinterne Metriken im Prometheus-Textformat (ohne prometheus_client)
+Zähler und Histogramme halten pro Label-Kombination nur ein paar Zahlen; jede Metrik hat
+einen eigenen Lock, der nur für die Addition gehalten wird. MNIST_METRICS=0 schaltet die
+Stufen-Messung ab (Timer werden zu No-ops).
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+ENABLED = os.environ.get('MNIST_METRICS', '1') != '0'
+
+# Sekunden; deckt Cache-Treffer (µs) bis langsame Forward-Pässe ab
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monoton steigender Zähler, optional mit Labels"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name + '_total', _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Kumulative Buckets wie bei Prometheus; observe() in Sekunden"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [Zähler pro Bucket (+Inf am Ende), Summe, Anzahl]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        """Kontextmanager, der die Dauer des Blocks beobachtet (No-op bei MNIST_METRICS=0)"""
+        return _Timer(self, label_values) if ENABLED else _NULL_TIMER
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = (('le', _format_value(bound)),)
+                yield self.name + '_bucket', _format_labels(self.labels, label_values, le), cumulative
+            yield self.name + '_sum', _format_labels(self.labels, label_values), total
+            yield self.name + '_count', _format_labels(self.labels, label_values), count
+
+
+class _Timer:
+    # Klasse statt @contextmanager: spart den Generator pro Messung
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+
+class MetricsRegistry:
+    """Sammelt Metriken und Gauge-Callbacks; render() liefert das Prometheus-Textformat"""
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, collect, labels=(), kind='gauge'):
+        """
+        collect() -> Zahl oder Liste von (Label-Werte, Zahl); wird erst beim Abruf ausgewertet.
+        kind='counter' für Zähler, die an anderer Stelle ohnehin geführt werden (z.B. Cache-Statistik).
+        """
+        self._gauges.append((name, help_text, tuple(labels), collect, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        for name, help_text, label_names, collect, kind in self._gauges:
+            try:
+                values = collect()
+            except Exception:
+                # Eine fehlerhafte Gauge darf den Rest der Ausgabe nicht verhindern
+                continue
+            if values is None:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if not isinstance(values, (list, tuple)):
+                values = [((), values)]
+            for label_values, value in values:
+                lines.append(f'{name}{_format_labels(label_names, label_values)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = MetricsRegistry()
+
+requests_total = registry.counter('mnist_requests', 'HTTP-Requests nach Endpunkt und Status',
+                                  labels=('endpoint', 'status'))
+errors_total = registry.counter('mnist_request_errors', 'HTTP-Antworten mit Status >= 400',
+                                labels=('endpoint', 'status'))
+request_seconds = registry.histogram('mnist_request_duration_seconds', 'Gesamtdauer pro Request',
+                                     labels=('endpoint',))
+stage_seconds = registry.histogram('mnist_stage_duration_seconds',
+                                   'Dauer der Verarbeitungsstufen (base64, decode, preprocess, inference, serialize)',
+                                   labels=('stage',))
+
+
+def stage(name):
+    """Kontextmanager: misst eine Verarbeitungsstufe, z.B. with metrics.stage('decode'): ..."""
+    return stage_seconds.time(name)
+
+
+def record_request(endpoint, status, seconds):
+    requests_total.inc(endpoint, str(status))
+    if status >= 400:
+        errors_total.inc(endpoint, str(status))
+    request_seconds.observe(seconds, endpoint)
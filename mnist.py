@@ -0,0 +1,133 @@
+"""
+MNIST Datenverarbeitung: vorverarbeiteter Datensatz-Cache (.npy, memory-mapped)
+prepare() lädt MNIST einmal und schreibt uint8-Bilder, Labels und die normalisierten
+float32-Bilder (N, 28, 28, 1) als .npy. load() öffnet sie per mmap: kein Normalisieren
+beim Start, und parallele Prozesse (Sweep-Trials, Evaluationen) teilen sich den Page-Cache.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from model_registry import atomic_write
+
+CACHE_DIR = os.environ.get('MNIST_DATA_CACHE',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_cache'))
+# Bei Änderungen an der Vorverarbeitung erhöhen, dann wird der Cache neu geschrieben
+CACHE_FORMAT = 2
+SPLITS = ('train', 'test')
+DTYPES = ('float32', 'uint8')
+# Bilder pro Block beim Schreiben der float32-Arrays
+_CHUNK = 4096
+
+
+def _path(cache_dir, split, name):
+    return os.path.join(cache_dir, f'{split}_{name}.npy')
+
+
+def _meta_path(cache_dir):
+    return os.path.join(cache_dir, 'meta.json')
+
+
+def is_prepared(cache_dir=None):
+    cache_dir = cache_dir or CACHE_DIR
+    try:
+        with open(_meta_path(cache_dir), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('format') == CACHE_FORMAT and all(
+        os.path.exists(_path(cache_dir, split, name))
+        for split in SPLITS for name in ('x_uint8', 'x_float32', 'y'))
+
+
+def _write_npy(path, array):
+    atomic_write(path, lambda tmp: np.save(tmp, array))
+
+
+def _write_float(path, images):
+    """Normalisiert blockweise direkt in eine .npy-Datei, ohne eine float32-Kopie im Speicher"""
+    from preprocessing import preprocess_batch
+
+    def write(tmp):
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=images.shape + (1,))
+        for start in range(0, len(images), _CHUNK):
+            # Gleiche Pipeline wie im Backend (für MNIST bitgleich zu x / 255.0)
+            preprocess_batch(images[start:start + _CHUNK], out=out[start:start + _CHUNK])
+        out.flush()
+        del out
+
+    atomic_write(path, write)
+
+
+def prepare(cache_dir=None, force=False):
+    """Schreibt den Cache (falls nötig) und gibt das Verzeichnis zurück"""
+    cache_dir = cache_dir or CACHE_DIR
+    if not force and is_prepared(cache_dir):
+        return cache_dir
+    # TensorFlow nur für den einmaligen Download/Import der Rohdaten
+    from tensorflow.keras.datasets import mnist as keras_mnist
+
+    os.makedirs(cache_dir, exist_ok=True)
+    (x_train, y_train), (x_test, y_test) = keras_mnist.load_data()
+    for split, x, y in (('train', x_train, y_train), ('test', x_test, y_test)):
+        _write_npy(_path(cache_dir, split, 'x_uint8'), x.astype(np.uint8))
+        _write_npy(_path(cache_dir, split, 'y'), y.astype(np.int64))
+        _write_float(_path(cache_dir, split, 'x_float32'), x)
+    # meta.json zuletzt: ein abgebrochener Lauf hinterlässt nie einen scheinbar gültigen Cache
+    meta = {'format': CACHE_FORMAT, 'train': len(x_train), 'test': len(x_test)}
+
+    def write_meta(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    atomic_write(_meta_path(cache_dir), write_meta)
+    return cache_dir
+
+
+def load(split='train', dtype='float32', cache_dir=None, mmap=True):
+    """
+    Ein Split als (x, y), bei Bedarf wird der Cache vorher erzeugt.
+
+    dtype='float32': (N, 28, 28, 1) in [0, 1]; dtype='uint8': (N, 28, 28) Rohbilder.
+    Mit mmap sind die Arrays schreibgeschützte Memory-Maps; Änderungen brauchen eine Kopie.
+    """
+    if split not in SPLITS:
+        raise ValueError(f"Unbekannter Split '{split}' (erwartet {', '.join(SPLITS)})")
+    if dtype not in DTYPES:
+        raise ValueError(f"Unbekannter dtype '{dtype}' (erwartet {', '.join(DTYPES)})")
+    cache_dir = prepare(cache_dir)
+    mode = 'r' if mmap else None
+    x = np.load(_path(cache_dir, split, f'x_{dtype}'), mmap_mode=mode)
+    y = np.load(_path(cache_dir, split, 'y'), mmap_mode=mode)
+    return x, y
+
+
+def load_data(dtype='float32', cache_dir=None, mmap=True):
+    """Wie keras.datasets.mnist.load_data(), aber aus dem Cache: ((x_train, y_train), (x_test, y_test))"""
+    return tuple(load(split, dtype, cache_dir, mmap) for split in SPLITS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erzeugt den vorverarbeiteten MNIST-Cache (.npy)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Zielverzeichnis (MNIST_DATA_CACHE)')
+    parser.add_argument('--force', action='store_true', help='Cache neu schreiben')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache_dir = prepare(args.cache_dir, force=args.force)
+    prepare_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    (x_train, _), (x_test, _) = load_data(cache_dir=cache_dir)
+    load_ms = (time.perf_counter() - start) * 1000.0
+
+    print(f"✓ MNIST-Cache: {cache_dir} ({prepare_seconds:.1f} s)")
+    for name in sorted(os.listdir(cache_dir)):
+        print(f"   {name:22} {os.path.getsize(os.path.join(cache_dir, name)) / 1e6:8.1f} MB")
+    print(f"   Öffnen per mmap: {load_ms:.1f} ms (train {x_train.shape}, test {x_test.shape})")
+
+
+if __name__ == '__main__':
+    main()
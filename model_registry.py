@@ -0,0 +1,152 @@
+"""
+Versionierte Modell-Registry mit Hot-Swap ohne Ausfallzeit
+Versionen sind die zeitgestempelten Dateien aus NN_Model.py
+(mnist_model[_<tag>]_<typ>_<stempel>.keras / .npz / _int8.tflite).
+Laden und Warm-up laufen in einem Hintergrund-Thread; danach wird die aktive Engine
+atomar ausgetauscht. Laufende Requests rechnen mit der alten Engine zu Ende.
+"""
+import datetime
+import os
+import re
+import threading
+import time
+
+# Dateiendung der Modellversionen pro Backend
+SUFFIXES = {
+    'keras': '.keras',
+    'numpy': '.npz',
+    'tflite': '_int8.tflite',
+}
+
+_VERSION_PATTERN = re.compile(
+    r'^mnist_model(?:_(?P<tag>.+))?_(?P<model_type>dense|cnn)_(?P<stamp>\d{8}_\d{6})$')
+
+
+class ReloadInProgress(RuntimeError):
+    """Es läuft bereits ein Ladevorgang"""
+
+
+def atomic_write(path, write_fn):
+    """Schreibt über write_fn(tmp) in eine temporäre Datei, ersetzt path atomar, gibt write_fn-Ergebnis zurück"""
+    root, ext = os.path.splitext(path)
+    # Endung bleibt erhalten (Keras verlangt .keras); die Registry ignoriert .tmp-Dateien
+    tmp = f"{root}.tmp{os.getpid()}{ext}"
+    try:
+        result = write_fn(tmp)
+        os.replace(tmp, path)
+        return result
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def parse_version(file_name, suffix):
+    """'mnist_model_cnn_20250101_120000.keras' -> Metadaten-Dict oder None"""
+    if not file_name.endswith(suffix):
+        return None
+    match = _VERSION_PATTERN.match(file_name[:-len(suffix)])
+    if match is None:
+        return None
+    return {'version': file_name[:-len(suffix)], **match.groupdict()}
+
+
+class ModelRegistry:
+    """Verwaltet die aktive Modellversion; load_fn(path) liefert eine vorgewärmte Engine"""
+
+    def __init__(self, backend, load_fn, directory='.', default_path=None, on_swap=None):
+        self.backend = backend
+        # Unbekannte Backends haben keine Versionen; load_fn meldet den Fehler beim Laden
+        self.suffix = SUFFIXES.get(backend)
+        self.load_fn = load_fn
+        self.directory = directory
+        self.default_path = default_path
+        self.on_swap = on_swap
+        self.engine = None
+        self._active = None
+        self._loading = None
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    def versions(self):
+        """Alle Versionen im Verzeichnis, älteste zuerst"""
+        found = []
+        if self.suffix is None:
+            return found
+        for file_name in os.listdir(self.directory):
+            info = parse_version(file_name, self.suffix)
+            if info is not None:
+                info['path'] = os.path.join(self.directory, file_name)
+                found.append(info)
+        return sorted(found, key=lambda info: (info['stamp'], info['version']))
+
+    def resolve(self, version=None):
+        """Version -> (Versionsname, Pfad); None = neueste Version, sonst Standarddatei"""
+        if version is None or version == 'latest':
+            versions = self.versions()
+            if versions:
+                return versions[-1]['version'], versions[-1]['path']
+            if self.default_path is None:
+                raise FileNotFoundError(f"Keine Modellversion ({self.suffix}) in {self.directory}")
+            return os.path.splitext(os.path.basename(self.default_path))[0], self.default_path
+        for info in self.versions():
+            if info['version'] == version:
+                return info['version'], info['path']
+        raise KeyError(f"Unbekannte Modellversion '{version}'")
+
+    def load(self, version=None, path=None, background=True):
+        """
+        Lädt eine Version und tauscht sie nach dem Warm-up ein.
+
+        path überschreibt die Auflösung über den Versionsnamen (z.B. MNIST_MODEL_PATH).
+        Im Hintergrund: gibt sofort den Ladestatus zurück, sonst den Status nach dem Austausch
+        (Ladefehler werden dann ausgelöst). Läuft bereits ein Ladevorgang, wird
+        ReloadInProgress ausgelöst; eine unbekannte Version löst KeyError aus.
+        """
+        if path is None:
+            version, path = self.resolve(version)
+        elif version in (None, 'latest'):
+            version = os.path.splitext(os.path.basename(path))[0]
+        with self._lock:
+            if self._loading is not None:
+                raise ReloadInProgress(f"Ladevorgang für '{self._loading['version']}' läuft bereits")
+            self._loading = {'version': version, 'path': path, 'started_at': _now()}
+            loading = dict(self._loading)
+        if not background:
+            error = self._load(version, path)
+            if error is not None:
+                raise error
+            return self.status()
+        threading.Thread(target=self._load, args=(version, path), name='model-loader', daemon=True).start()
+        return loading
+
+    def _load(self, version, path):
+        start = time.perf_counter()
+        try:
+            engine = self.load_fn(path)
+        except Exception as e:
+            # Fehlgeschlagene Ladevorgänge lassen die aktive Version unangetastet
+            with self._lock:
+                self._last_error = {'version': version, 'error': str(e), 'at': _now()}
+                self._loading = None
+            return e
+        load_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            # Atomarer Austausch: neue Requests sehen ab hier nur noch die neue Engine
+            self.engine = engine
+            self._active = {'version': version, 'path': path, 'loaded_at': _now(), 'load_ms': load_ms}
+            self._loading = None
+            self._last_error = None
+            if self.on_swap is not None:
+                self.on_swap(engine)
+
+    def status(self):
+        with self._lock:
+            return {
+                'active': dict(self._active) if self._active else None,
+                'loading': dict(self._loading) if self._loading else None,
+                'last_error': dict(self._last_error) if self._last_error else None,
+            }
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
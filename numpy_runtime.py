@@ -0,0 +1,151 @@
+"""
+Reine NumPy-Inferenz für exportierte MNIST-Modelle (ohne TensorFlow-Import)
+Lädt die von export_model.py geschriebene .npz-Datei (BatchNorm bereits gefaltet)
+und führt Conv2D/MaxPool/Dense/Softmax direkt mit NumPy aus.
+"""
+import json
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FORMAT_VERSION = 1
+# Bilder pro Block, begrenzt den Speicher der im2col-Matrix
+CHUNK_SIZE = 64
+
+
+def _activation(x, name):
+    if name == 'relu':
+        return np.maximum(x, 0.0, out=x)
+    if name == 'softmax':
+        x -= x.max(axis=-1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=-1, keepdims=True)
+        return x
+    if name == 'linear':
+        return x
+    raise ValueError(f'Unbekannte Aktivierung: {name}')
+
+
+def _same_padding(size, kernel, stride):
+    total = max((-(-size // stride) - 1) * stride + kernel - size, 0)
+    return total // 2, total - total // 2
+
+
+def _pad(x, kernel, strides, padding, value=0.0):
+    if padding != 'same':
+        return x
+    pad_h = _same_padding(x.shape[1], kernel[0], strides[0])
+    pad_w = _same_padding(x.shape[2], kernel[1], strides[1])
+    return np.pad(x, ((0, 0), pad_h, pad_w, (0, 0)), constant_values=value)
+
+
+def conv2d(x, kernel, bias, strides=(1, 1), padding='valid'):
+    """(N, H, W, C) * (kh, kw, C, O) per im2col + einer Matrixmultiplikation"""
+    kh, kw, channels, filters = kernel.shape
+    x = _pad(x, (kh, kw), strides, padding)
+    # (N, OH, OW, C, kh, kw) -> (N, OH, OW, kh, kw, C) passend zum HWIO-Kernel
+    windows = sliding_window_view(x, (kh, kw), axis=(1, 2))[:, ::strides[0], ::strides[1]]
+    n, oh, ow = windows.shape[:3]
+    cols = windows.transpose(0, 1, 2, 4, 5, 3).reshape(n * oh * ow, kh * kw * channels)
+    out = cols @ kernel.reshape(kh * kw * channels, filters)
+    if bias is not None:
+        out += bias
+    return out.reshape(n, oh, ow, filters)
+
+
+def max_pool2d(x, pool_size=(2, 2), strides=(2, 2), padding='valid'):
+    ph, pw = pool_size
+    if tuple(pool_size) == tuple(strides) and padding == 'valid':
+        n, h, w, c = x.shape
+        h, w = h // ph * ph, w // pw * pw
+        return x[:, :h, :w].reshape(n, h // ph, ph, w // pw, pw, c).max(axis=(2, 4))
+    x = _pad(x, pool_size, strides, padding, value=-np.inf)
+    windows = sliding_window_view(x, (ph, pw), axis=(1, 2))[:, ::strides[0], ::strides[1]]
+    return windows.max(axis=(-2, -1))
+
+
+class NumpyModel:
+    """Sequenz von Operationen aus einer exportierten .npz-Datei"""
+
+    def __init__(self, ops, weights, input_shape):
+        self.ops = ops
+        self.weights = weights
+        self.input_shape = tuple(input_shape)
+        self.num_classes = int(weights[f"op{self._last_dense()}_kernel"].shape[-1])
+        # Gleiche Schnittstelle wie inference.InferenceEngine
+        self.buckets = ()
+        self.warmup_ms = {}
+        self.startup = {}
+
+    def _last_dense(self):
+        return max(i for i, op in enumerate(self.ops) if op['type'] == 'dense')
+
+    def _forward(self, x):
+        for i, op in enumerate(self.ops):
+            kind = op['type']
+            if kind == 'conv2d':
+                x = conv2d(x, self.weights[f'op{i}_kernel'], self.weights.get(f'op{i}_bias'),
+                           op['strides'], op['padding'])
+                x = _activation(x, op['activation'])
+            elif kind == 'dense':
+                x = x @ self.weights[f'op{i}_kernel']
+                if f'op{i}_bias' in self.weights:
+                    x += self.weights[f'op{i}_bias']
+                x = _activation(x, op['activation'])
+            elif kind == 'affine':
+                x = x * self.weights[f'op{i}_scale'] + self.weights[f'op{i}_shift']
+            elif kind == 'maxpool':
+                x = max_pool2d(x, op['pool_size'], op['strides'], op['padding'])
+            elif kind == 'flatten':
+                x = x.reshape(len(x), -1)
+            else:
+                raise ValueError(f'Unbekannte Operation: {kind}')
+        return x
+
+    def predict(self, batch):
+        """(N, 28, 28[, 1]) float32 -> (N, num_classes) Wahrscheinlichkeiten"""
+        batch = np.asarray(batch, dtype=np.float32)
+        n = len(batch)
+        batch = batch.reshape((n,) + self.input_shape)
+        out = np.empty((n, self.num_classes), dtype=np.float32)
+        for start in range(0, n, CHUNK_SIZE):
+            out[start:start + CHUNK_SIZE] = self._forward(batch[start:start + CHUNK_SIZE])
+        return out
+
+    def warmup(self):
+        self.predict(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        return self.warmup_ms
+
+
+def save_numpy_model(path, ops, weights, input_shape):
+    """Schreibt Operationen + Gewichte als .npz (Konfiguration als JSON-String)"""
+    config = json.dumps({'version': FORMAT_VERSION, 'input_shape': list(input_shape), 'ops': ops})
+    arrays = {name: np.ascontiguousarray(value, dtype=np.float32) for name, value in weights.items()}
+    np.savez(path, config=np.array(config), **arrays)
+
+
+def load_numpy_model(path, warmup=True):
+    """Lädt eine exportierte .npz-Datei als NumpyModel"""
+    start = time.perf_counter()
+    with np.load(path, allow_pickle=False) as data:
+        config = json.loads(str(data['config']))
+        weights = {name: data[name] for name in data.files if name != 'config'}
+    if config.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Nicht unterstützte Exportversion: {config.get('version')}")
+    model = NumpyModel(config['ops'], weights, config['input_shape'])
+    load_ms = (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    if warmup:
+        model.warmup()
+    warmup_ms = (time.perf_counter() - start) * 1000.0
+    model.startup = {
+        'path': path,
+        'backend': 'numpy',
+        'load_ms': load_ms,
+        'trace_ms': 0.0,
+        'warmup_ms': warmup_ms,
+        'total_ms': load_ms + warmup_ms,
+    }
+    return model
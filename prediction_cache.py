@@ -0,0 +1,105 @@
+"""
+Inhaltsadressierter LRU-Cache für Vorhersagen
+Schlüssel 1: Hash der hochgeladenen Rohdaten (spart Dekodieren, Resize und Forward-Pass).
+Schlüssel 2: Hash des vorverarbeiteten 28x28-Arrays (fängt andere Kodierungen derselben Pixel ab).
+Der Speicherverbrauch ist über max_bytes begrenzt; clear() bei Modellwechsel.
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Grober Overhead pro Eintrag (OrderedDict-Knoten, Tupel, Schlüssel-String)
+_ENTRY_OVERHEAD = 200
+
+
+def _nbytes(value):
+    return sum(v.nbytes if isinstance(v, np.ndarray) else sys.getsizeof(v) for v in value)
+
+
+class PredictionCache:
+    """Thread-sicherer LRU-Cache mit Byte-Obergrenze und Generationszähler"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._hits = {'raw': 0, 'pixel': 0}
+        self._misses = {'raw': 0, 'pixel': 0}
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def raw_key(data):
+        return 'raw:' + hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    @staticmethod
+    def pixel_key(array):
+        return 'px:' + hashlib.blake2b(np.ascontiguousarray(array).tobytes(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Liefert den Eintrag oder None; zählt Treffer/Fehlschläge pro Schlüsselart"""
+        if not self.enabled:
+            return None
+        kind = 'raw' if key.startswith('raw:') else 'pixel'
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses[kind] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits[kind] += 1
+            return value[0]
+
+    def put(self, key, value, generation=None):
+        """Speichert value; Ergebnisse eines inzwischen ersetzten Modells werden verworfen"""
+        if not self.enabled:
+            return
+        size = _nbytes(value) + len(key) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        """Invalidiert alle Einträge (z.B. nach /reload)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self._hits.values())
+            lookups = self._hits['raw'] + self._misses['raw']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': dict(self._hits),
+                'misses': dict(self._misses),
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'generation': self.generation,
+            }
@@ -0,0 +1,144 @@
+"""
+Vektorisierte Bildvorverarbeitung für MNIST
+Graustufen, LANCZOS-Resampling auf 28x28, Hintergrund-Invertierung und
+Normalisierung als Batch-Operationen auf NumPy-Arrays. Wird von app.py und
+test_model_locally.py verwendet, damit Training/Evaluation und Serving
+identisch vorverarbeiten.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+TARGET_SIZE = 28
+# Zeilen pro Block beim horizontalen Resampling
+_CHUNK_ROWS = 256
+
+
+def image_to_array(image):
+    """Wandelt ein dekodiertes PIL-Bild in ein uint8-Array (H, W) oder (H, W, C) um"""
+    if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        image = image.convert('L')
+    return np.asarray(image, dtype=np.uint8)
+
+
+def gray_weights(channels):
+    """Kanalgewichte wie PIL convert('L'): ITU-R 601-2 Luma, Alpha wird ignoriert"""
+    if channels <= 2:
+        # L bzw. LA
+        weights = [1.0, 0.0][:channels]
+    else:
+        weights = [19595 / 65536, 38470 / 65536, 7471 / 65536, 0.0][:channels]
+    return np.array(weights, dtype=np.float32)
+
+
+def _lanczos(x):
+    return np.where(np.abs(x) < 3.0, np.sinc(x) * np.sinc(x / 3.0), 0.0)
+
+
+@lru_cache(maxsize=64)
+def lanczos_matrix(in_size, out_size=TARGET_SIZE):
+    """Resampling-Matrix (out_size, in_size) mit denselben Koeffizienten wie PIL LANCZOS"""
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = 3.0 * filterscale
+    matrix = np.zeros((out_size, in_size), dtype=np.float32)
+    for i in range(out_size):
+        center = (i + 0.5) * scale
+        lo = max(int(center - support + 0.5), 0)
+        hi = min(int(center + support + 0.5), in_size)
+        weights = _lanczos((np.arange(lo, hi) - center + 0.5) / filterscale)
+        total = weights.sum()
+        if total != 0.0:
+            weights = weights / total
+        matrix[i, lo:hi] = weights
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=64)
+def horizontal_matrix(width, channels, out_size=TARGET_SIZE):
+    """Graustufen-Konvertierung und horizontales Resampling als eine Matrix (width*channels, out_size)"""
+    resample = lanczos_matrix(width, out_size).T if width != out_size else np.eye(width, dtype=np.float32)
+    matrix = np.kron(resample, gray_weights(channels)[:, None]).astype(np.float32)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _round_u8(x):
+    # PIL rundet nach jedem Resampling-Durchgang auf uint8 (round half up + clipping)
+    np.floor(x + 0.5, out=x)
+    return np.clip(x, 0.0, 255.0, out=x)
+
+
+def _horizontal_pass(stack, size):
+    """(N, H, W[, C]) -> (N, H, size) float32, blockweise damit der float32-Puffer im Cache bleibt"""
+    n, height, width = stack.shape[:3]
+    channels = stack.shape[3] if stack.ndim == 4 else 1
+    rows = np.ascontiguousarray(stack).reshape(n * height, width * channels)
+    out = np.empty((n * height, size), dtype=np.float32)
+    if width == size and channels == 1:
+        np.copyto(out, rows, casting='unsafe')
+        return out.reshape(n, height, size)
+
+    matrix = horizontal_matrix(width, channels, size)
+    buffer = np.empty((min(_CHUNK_ROWS, len(rows)), width * channels), dtype=np.float32)
+    for start in range(0, len(rows), _CHUNK_ROWS):
+        block = rows[start:start + _CHUNK_ROWS]
+        chunk = buffer[:len(block)]
+        np.copyto(chunk, block, casting='unsafe')
+        np.matmul(chunk, matrix, out=out[start:start + len(block)])
+    return _round_u8(out).reshape(n, height, size)
+
+
+def resize_batch(stack, size=TARGET_SIZE):
+    """(N, H, W[, C]) uint8 -> (N, size, size) float32 Graustufen per separierbarer Matrixmultiplikation"""
+    gray = _horizontal_pass(stack, size)
+    height = gray.shape[1]
+    if height != size:
+        gray = _round_u8(np.matmul(lanczos_matrix(height, size), gray))
+    return gray
+
+
+def _preprocess_stack(stack, out):
+    gray = resize_batch(stack)
+    # MNIST hat weiße Ziffern auf schwarzem Hintergrund: helle Bilder invertieren
+    invert = gray.mean(axis=(1, 2)) > 127
+    if invert.any():
+        gray[invert] = 255.0 - gray[invert]
+    # Division statt Multiplikation mit 1/255: bitgleich zu x / 255.0 im Training
+    np.divide(gray, 255.0, out=out[..., 0])
+
+
+def preprocess_batch(images, out=None):
+    """
+    Vorverarbeitung eines Stapels dekodierter Bilder zu (N, 28, 28, 1) float32 in [0, 1].
+
+    images: Array (N, H, W[, C]) uint8 oder Liste von Arrays (auch unterschiedlicher Größe)
+    out:    optional vorallokierter float32-Puffer (N, 28, 28, 1), wird in-place beschrieben
+    """
+    if isinstance(images, np.ndarray):
+        groups = {images.shape[1:]: (slice(None), images)} if len(images) else {}
+        n = len(images)
+    else:
+        n = len(images)
+        by_shape = {}
+        for i, image in enumerate(images):
+            by_shape.setdefault(np.shape(image), []).append(i)
+        groups = {
+            shape: (slice(None) if len(idx) == n else idx, np.stack([np.asarray(images[i]) for i in idx]))
+            for shape, idx in by_shape.items()
+        }
+
+    if out is None:
+        out = np.empty((n, TARGET_SIZE, TARGET_SIZE, 1), dtype=np.float32)
+    elif out.shape != (n, TARGET_SIZE, TARGET_SIZE, 1) or out.dtype != np.float32:
+        raise ValueError(f'Ausgabepuffer muss (N={n}, 28, 28, 1) float32 sein, ist {out.shape} {out.dtype}')
+
+    for index, stack in groups.values():
+        if isinstance(index, slice):
+            _preprocess_stack(stack, out)
+        else:
+            target = np.empty((len(index), TARGET_SIZE, TARGET_SIZE, 1), dtype=np.float32)
+            _preprocess_stack(stack, target)
+            out[index] = target
+    return out
@@ -0,0 +1,211 @@
+"""
+Post-Training-Quantisierung (int8) und TFLite-Serving
+Erzeugt aus dem trainierten Keras-Modell mit einem Kalibrierungs-Subset eine
+vollständig int8-quantisierte .tflite-Variante und vergleicht float32 vs. int8
+(Accuracy, F1 pro Klasse, Dateigröße, CPU-Durchsatz).
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_BUCKETS = (1, 8, 32, 128)
+
+
+def _interpreter_class():
+    """LiteRT bevorzugen (kein TensorFlow-Import), sonst tflite_runtime bzw. tf.lite"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def quantize_int8(model, calibration_data, path):
+    """Konvertiert ein Keras-Modell nach int8 (Kalibrierung über calibration_data), gibt Dateigröße zurück"""
+    import tensorflow as tf
+
+    def representative_dataset():
+        for i in range(len(calibration_data)):
+            yield [np.asarray(calibration_data[i:i + 1], dtype=np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # Nur int8-Kernels; Ein-/Ausgabe bleiben float32 (Quantisieren/Dequantisieren im Modell)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    tflite_model = converter.convert()
+    with open(path, 'wb') as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+def float32_tflite_size(model):
+    """Größe des unquantisierten TFLite-Exports in Bytes: Vergleichsbasis für int8 (ohne Optimizer-Zustand)"""
+    import tensorflow as tf
+    return len(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+
+
+class TFLiteEngine:
+    """TFLite-Interpreter pro Batchgrößen-Bucket, gleiche Schnittstelle wie inference.InferenceEngine"""
+
+    def __init__(self, model_content, buckets=DEFAULT_BUCKETS, num_threads=None):
+        Interpreter = _interpreter_class()
+        self.buckets = tuple(sorted(set(int(b) for b in buckets)))
+        self.warmup_ms = {}
+        self.startup = {}
+        self._interpreters = {}
+        for b in self.buckets:
+            interpreter = Interpreter(model_content=model_content, num_threads=num_threads)
+            input_details = interpreter.get_input_details()[0]
+            interpreter.resize_tensor_input(input_details['index'], [b] + list(input_details['shape'][1:]))
+            interpreter.allocate_tensors()
+            self._interpreters[b] = interpreter
+        self._input = interpreter.get_input_details()[0]
+        self._output = interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(d) for d in self._input['shape'][1:])
+        self.num_classes = int(self._output['shape'][-1])
+        # Interpreter sind nicht thread-sicher
+        self._lock = threading.Lock()
+
+    def warmup(self, repeats=3):
+        for b in self.buckets:
+            x = np.zeros((b,) + self.input_shape, dtype=np.float32)
+            start = time.perf_counter()
+            self.predict(x)
+            cold = (time.perf_counter() - start) * 1000.0
+            start = time.perf_counter()
+            for _ in range(repeats):
+                self.predict(x)
+            warm = (time.perf_counter() - start) * 1000.0 / max(repeats, 1)
+            self.warmup_ms[b] = {'cold': cold, 'warm': warm}
+        return self.warmup_ms
+
+    def bucket_for(self, n):
+        for b in self.buckets:
+            if b >= n:
+                return b
+        return self.buckets[-1]
+
+    def _quantize_input(self, x):
+        if self._input['dtype'] == np.float32:
+            return x
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(self._input['dtype'])
+        return np.clip(np.round(x / scale) + zero_point, info.min, info.max).astype(self._input['dtype'])
+
+    def _dequantize_output(self, y):
+        if self._output['dtype'] == np.float32:
+            return y
+        scale, zero_point = self._output['quantization']
+        return (y.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch):
+        """(N, 28, 28[, 1]) float32 -> (N, num_classes) Wahrscheinlichkeiten"""
+        batch = np.asarray(batch, dtype=np.float32)
+        n = len(batch)
+        batch = batch.reshape((n,) + self.input_shape)
+        out = np.empty((n, self.num_classes), dtype=np.float32)
+        largest = self.buckets[-1]
+        for start in range(0, n, largest):
+            chunk = batch[start:start + largest]
+            size = len(chunk)
+            bucket = self.bucket_for(size)
+            if size < bucket:
+                padded = np.zeros((bucket,) + self.input_shape, dtype=np.float32)
+                padded[:size] = chunk
+                chunk = padded
+            interpreter = self._interpreters[bucket]
+            with self._lock:
+                interpreter.set_tensor(self._input['index'], self._quantize_input(chunk))
+                interpreter.invoke()
+                result = interpreter.get_tensor(self._output['index'])[:size]
+            out[start:start + size] = self._dequantize_output(result)
+        return out
+
+
+def load_tflite_engine(path, buckets=DEFAULT_BUCKETS, num_threads=None, warmup=True):
+    """Lädt eine .tflite-Datei als TFLiteEngine"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        model_content = f.read()
+    engine = TFLiteEngine(model_content, buckets=buckets, num_threads=num_threads)
+    load_ms = (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    if warmup:
+        engine.warmup()
+    warmup_ms = (time.perf_counter() - start) * 1000.0
+    engine.startup = {
+        'path': path,
+        'backend': 'tflite',
+        'load_ms': load_ms,
+        'trace_ms': 0.0,
+        'warmup_ms': warmup_ms,
+        'total_ms': load_ms + warmup_ms,
+    }
+    return engine
+
+
+def measure_throughput(engine, x, batch_size, min_images=512):
+    """Bilder/s bei fester Batchgröße (nach einem Warm-up-Durchlauf)"""
+    n = min(len(x), max(min_images, batch_size * 20))
+    n -= n % batch_size
+    engine.predict(x[:batch_size])
+    start = time.perf_counter()
+    for i in range(0, n, batch_size):
+        engine.predict(x[i:i + batch_size])
+    return n / (time.perf_counter() - start)
+
+
+def write_quantization_report(model, keras_path, tflite_path, x_test, y_test,
+                              out_path='quantization_report.txt', batch_sizes=(1, 32, 256)):
+    """Vergleich float32 (Keras) vs. int8 (TFLite) als Textreport"""
+    from sklearn.metrics import classification_report, f1_score
+    from inference import InferenceEngine
+
+    float_engine = InferenceEngine(model, buckets=batch_sizes)
+    float_engine.warmup()
+    int8_engine = load_tflite_engine(tflite_path, buckets=batch_sizes)
+    variants = [('float32', float_engine, keras_path), ('int8', int8_engine, tflite_path)]
+
+    rows = {}
+    for name, engine, path in variants:
+        predicted = engine.predict(x_test).argmax(axis=1)
+        rows[name] = {
+            'predicted': predicted,
+            'accuracy': float((predicted == y_test).mean()),
+            'f1': f1_score(y_test, predicted, average=None),
+            'file_kb': os.path.getsize(path) / 1024.0,
+            'throughput': {b: measure_throughput(engine, x_test, b) for b in batch_sizes},
+        }
+
+    # Die .keras-Datei enthält den Optimizer-Zustand; verglichen wird TFLite float32 mit TFLite int8
+    rows['float32']['size_kb'] = float32_tflite_size(model) / 1024.0
+    rows['int8']['size_kb'] = rows['int8']['file_kb']
+
+    lines = ["Quantisierungsreport: float32 vs. int8", "=" * 60, ""]
+    lines.append(f"{'':24}{'float32':>14}{'int8':>14}")
+    lines.append(f"{'Accuracy':24}{rows['float32']['accuracy']:>14.4f}{rows['int8']['accuracy']:>14.4f}")
+    lines.append(f"{'TFLite-Größe (KB)':24}{rows['float32']['size_kb']:>14.1f}{rows['int8']['size_kb']:>14.1f}")
+    lines.append(f"{'Verkleinerung':24}{'':>14}{rows['float32']['size_kb'] / rows['int8']['size_kb']:>13.1f}x")
+    lines.append(f"{'.keras-Datei (KB)':24}{rows['float32']['file_kb']:>14.1f}{'-':>14}")
+    for b in batch_sizes:
+        label = f"Bilder/s (Batch {b})"
+        lines.append(f"{label:24}{rows['float32']['throughput'][b]:>14.0f}{rows['int8']['throughput'][b]:>14.0f}")
+    lines += ["", "Größenvergleich: beide Varianten als TFLite-Export (nur Gewichte und Graph);",
+              ".keras-Datei inkl. Optimizer-Zustand nur zur Information."]
+    lines += ["", "F1 pro Klasse", "-" * 60, f"{'Klasse':24}{'float32':>14}{'int8':>14}"]
+    for digit, (f1_float, f1_int8) in enumerate(zip(rows['float32']['f1'], rows['int8']['f1'])):
+        lines.append(f"{digit:<24}{f1_float:>14.4f}{f1_int8:>14.4f}")
+    lines += ["", "Classification Report (int8)", "-" * 60,
+              classification_report(y_test, rows['int8']['predicted'])]
+
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    return rows
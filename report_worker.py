@@ -0,0 +1,157 @@
+"""
+Report-Worker für NN_Model.py: Plots und Reports aus gespeicherten Vorhersagen
+Läuft als eigener Prozess, nachdem das Modell gespeichert ist, und braucht kein
+TensorFlow: Eingabe ist eine .npz mit Wahrscheinlichkeiten, Labels, Beispielbildern
+und Trainingsverlauf (siehe training.write_reports).
+
+    python report_worker.py report_data.npz [--out-dir .]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+def log(msg):
+    ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    line = f"[{ts}] [report] {msg}"
+    try:
+        with open('training_status.log', 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except Exception:
+        pass
+    print(line, flush=True)
+
+
+def load_report_data(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {
+            'probabilities': data['probabilities'],
+            'y_test': data['y_test'],
+            'samples': data['samples'],
+            'train_sample': data['train_sample'],
+            'train_label': int(data['train_label']),
+            'history': json.loads(str(data['history'])),
+            'model_file': str(data['model_file']),
+        }
+
+
+def build_report(data):
+    """Maschinenlesbarer Report (JSON) aus den Vorhersagen"""
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    y_test = data['y_test']
+    probabilities = data['probabilities']
+    predicted = probabilities.argmax(axis=1)
+    true_probs = np.clip(probabilities[np.arange(len(y_test)), y_test], 1e-7, 1.0)
+    per_class = classification_report(y_test, predicted, output_dict=True, zero_division=0)
+    return {
+        'model_file': data['model_file'],
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'test_samples': int(len(y_test)),
+        'test_accuracy': float((predicted == y_test).mean()),
+        'test_loss': float(-np.log(true_probs).mean()),
+        'per_class': {label: values for label, values in per_class.items() if label.isdigit()},
+        'macro_avg': per_class['macro avg'],
+        'weighted_avg': per_class['weighted avg'],
+        'confusion_matrix': confusion_matrix(y_test, predicted).tolist(),
+        'history': data['history'],
+    }
+
+
+def write_reports(data, out_dir='.'):
+    """Schreibt PNGs, classification_report.txt und evaluation_report.json nach out_dir"""
+    import matplotlib
+    matplotlib.use('Agg')  # Non-GUI Backend
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import classification_report
+
+    def out(name):
+        return os.path.join(out_dir, name)
+
+    y_test = data['y_test']
+    predicted_labels = data['probabilities'].argmax(axis=1)
+
+    plt.imshow(data['train_sample'].squeeze(), cmap='gray')
+    plt.title(f"Sample Label {data['train_label']}")
+    plt.savefig(out('training_image.png'))
+    plt.close()
+
+    # Einige Vorhersagen visualisieren
+    samples = data['samples']
+    plt.figure(figsize=(12, 4))
+    for i in range(len(samples)):
+        plt.subplot(2, 4, i+1)
+        plt.imshow(samples[i].squeeze(), cmap='gray')
+        plt.title(f"Pred: {predicted_labels[i]}\nTrue: {y_test[i]}")
+        plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(out('predictions_visualization.png'))
+    plt.close()
+    log("Vorhersage-Visualisierung fertig")
+
+    # Confusion Matrix
+    report = build_report(data)
+    cm = np.array(report['confusion_matrix'])
+    plt.figure(figsize=(6,6))
+    plt.imshow(cm, cmap='Blues')
+    plt.title('Confusion Matrix')
+    plt.xlabel('Predicted')
+    plt.ylabel('True')
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            plt.text(j, i, cm[i, j], ha='center', va='center', color='red', fontsize=8)
+    plt.tight_layout()
+    plt.savefig(out('confusion_matrix.png'))
+    plt.close()
+    log("Confusion Matrix fertig")
+
+    # Classification Report (Text wie bisher + JSON für Dashboards)
+    with open(out('classification_report.txt'), 'w', encoding='utf-8') as f:
+        f.write(classification_report(y_test, predicted_labels))
+    with open(out('evaluation_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    log("Classification Report geschrieben (classification_report.txt, evaluation_report.json)")
+
+    # Trainingskurven speichern
+    history = data['history']
+    if 'accuracy' in history:
+        plt.figure(figsize=(10,4))
+        plt.subplot(1,2,1)
+        plt.plot(history['accuracy'], label='train_acc')
+        plt.plot(history.get('val_accuracy', []), label='val_acc')
+        plt.title('Accuracy')
+        plt.legend()
+        plt.subplot(1,2,2)
+        plt.plot(history['loss'], label='train_loss')
+        plt.plot(history.get('val_loss', []), label='val_loss')
+        plt.title('Loss')
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(out('training_curves.png'))
+        plt.close()
+        log("Trainingskurven gespeichert")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Erzeugt Plots und Reports aus gespeicherten Vorhersagen")
+    parser.add_argument('data', help='.npz aus training.write_reports')
+    parser.add_argument('--out-dir', default='.', help='Zielverzeichnis')
+    parser.add_argument('--keep-data', action='store_true', help='Eingabedatei nicht löschen')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = write_reports(load_report_data(args.data), args.out_dir)
+    if not args.keep_data:
+        os.remove(args.data)
+    log(f"Reports fertig für {report['model_file']} ({time.perf_counter() - start:.1f} s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
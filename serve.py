@@ -0,0 +1,117 @@
+"""
+Produktiver Serving-Einstiegspunkt für das MNIST-Backend
+Linux/macOS: gunicorn mit mehreren Worker-Prozessen (gthread). Beim NumPy-Backend
+wird das Modell einmal im Master geladen und aufgewärmt (preload), die Worker teilen
+sich die Gewichtsseiten per Copy-on-Write. Windows: waitress (Threads, ein Prozess).
+SIGTERM beendet gracefully: laufende Requests und die Batching-Queue werden abgearbeitet.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Startet das MNIST-Backend für den Produktivbetrieb")
+    parser.add_argument('--host', default=os.environ.get('MNIST_HOST', '0.0.0.0'), help='Bind-Adresse')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MNIST_PORT', '5000')), help='Port')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MNIST_WORKERS', multiprocessing.cpu_count())),
+                        help='Anzahl Worker-Prozesse (Standard: CPU-Kerne)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('MNIST_THREADS', '4')),
+                        help='Threads pro Worker')
+    parser.add_argument('--backend', choices=['keras', 'numpy', 'tflite'], default=None,
+                        help='Inferenz-Backend (überschreibt MNIST_BACKEND)')
+    parser.add_argument('--preload', choices=['auto', 'yes', 'no'], default='auto',
+                        help='Modell vor dem Fork laden (auto: nur beim NumPy-Backend)')
+    parser.add_argument('--lazy', action='store_true', default=os.environ.get('MNIST_LAZY_STARTUP') == '1',
+                        help='Sofort binden, Importe und Modell im Hintergrund laden (MNIST_LAZY_STARTUP=1)')
+    parser.add_argument('--timeout', type=int, default=30, help='Worker-Timeout in Sekunden')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='Sekunden zum Abarbeiten laufender Requests beim Herunterfahren')
+    return parser.parse_args(argv)
+
+
+def _drain():
+    # Batching-Queue des Workers leeren, bevor der Prozess endet
+    backend = sys.modules.get('app')
+    if backend is not None:
+        backend.shutdown()
+
+
+def _worker_exit(server, worker):
+    _drain()
+
+
+def run_gunicorn(args, preload):
+    from gunicorn.app.base import BaseApplication
+
+    class MnistApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            if preload:
+                # Objekte aus dem Master nicht mehr vom GC anfassen lassen -> Seiten bleiben geteilt
+                gc.freeze()
+            return app
+
+    options = {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': preload,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'worker_exit': _worker_exit,
+    }
+    MnistApplication(options).run()
+
+
+def run_waitress(args):
+    import atexit
+    from waitress import serve
+    from app import app
+
+    atexit.register(_drain)
+    serve(app, host=args.host, port=args.port, threads=args.workers * args.threads)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend:
+        os.environ['MNIST_BACKEND'] = args.backend
+    if args.lazy:
+        os.environ['MNIST_LAZY_STARTUP'] = '1'
+    backend = os.environ.get('MNIST_BACKEND', 'keras')
+
+    # TensorFlow/TFLite-Laufzeiten sind nicht fork-sicher: dort lädt jeder Worker selbst
+    preload = args.preload == 'yes' or (args.preload == 'auto' and backend == 'numpy')
+    if preload and args.lazy:
+        # Der Lade-Thread des Masters überlebt den Fork nicht
+        print("⚠️ Verzögerter Start: kein Preload, jeder Worker lädt im Hintergrund")
+        preload = False
+    if preload and backend != 'numpy':
+        print(f"⚠️ Preload mit Backend '{backend}' ist nicht fork-sicher")
+
+    print("=" * 60)
+    print(f"🚀 MNIST Backend (Produktiv) auf {args.host}:{args.port}")
+    print(f"   Backend: {backend}, Worker: {args.workers}, Threads: {args.threads}, Preload: {preload}, "
+          f"verzögerter Start: {args.lazy}")
+    print("=" * 60)
+
+    if sys.platform == 'win32':
+        run_waitress(args)
+    else:
+        run_gunicorn(args, preload)
+
+
+if __name__ == '__main__':
+    main()
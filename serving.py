@@ -0,0 +1,445 @@
+"""
+Framework-unabhängiger Serving-Kern für das MNIST-Backend
+Modell-Engine, Batching-Queue, Vorhersage-Cache, Dekodierung und Antwortaufbau.
+Wird von app.py (Flask) und app_async.py (aiohttp) gemeinsam genutzt; das Modell lädt
+erst start(), damit app.py Importe und Laden getrennt (und optional im Hintergrund) messen kann.
+"""
+from PIL import Image
+import numpy as np
+import io
+import os
+import base64
+import functools
+import hashlib
+import time
+import metrics
+import startup
+from batching import MicroBatcher
+from preprocessing import TARGET_SIZE, image_to_array, preprocess_batch
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry, ReloadInProgress
+
+# Micro-Batching: Anfragen werden bis zu BATCH_WAIT_MS gesammelt (max. BATCH_MAX_SIZE pro Forward-Pass)
+BATCH_MAX_SIZE = int(os.environ.get('MNIST_BATCH_MAX_SIZE', '32'))
+BATCH_WAIT_MS = float(os.environ.get('MNIST_BATCH_WAIT_MS', '2'))
+# Obergrenze für Bilder pro /predict/batch Request
+BATCH_MAX_ITEMS = int(os.environ.get('MNIST_BATCH_MAX_ITEMS', '256'))
+# Speicherobergrenze des Vorhersage-Caches in MB (0 = deaktiviert)
+CACHE_MB = float(os.environ.get('MNIST_CACHE_MB', '16'))
+
+# 'keras' (TensorFlow), 'numpy' (exportierte .npz, kein TensorFlow-Import) oder 'tflite' (int8-Modell)
+BACKEND = os.environ.get('MNIST_BACKEND', 'keras')
+DEFAULT_MODEL_PATHS = {
+    'keras': 'mnist_model.keras',
+    'numpy': 'mnist_model.npz',
+    'tflite': 'mnist_model_int8.tflite',
+}
+# Versionen (zeitgestempelte Modelle aus NN_Model.py) liegen in MODEL_DIR; 'latest' = neueste
+MODEL_DIR = os.environ.get('MNIST_MODEL_DIR', '.')
+MODEL_VERSION = os.environ.get('MNIST_MODEL_VERSION', 'latest')
+# Fester Pfad statt Registry-Auflösung (optional)
+MODEL_PATH = os.environ.get('MNIST_MODEL_PATH')
+# Batchgrößen, für die beim Start ein kompilierter Forward-Pass erzeugt und aufgewärmt wird
+INFERENCE_BUCKETS = tuple(int(b) for b in os.environ.get('MNIST_INFERENCE_BUCKETS', '1,8,32,128').split(','))
+INFERENCE_XLA = os.environ.get('MNIST_INFERENCE_XLA', '0') == '1'
+# Ensemble (optional): Zusatzmodelle und/oder TTA nur für Bilder mit confidence < Schwelle
+# MNIST_ENSEMBLE_SIZE: die N neuesten anderen Versionen; MNIST_ENSEMBLE_MODELS: Versionen/Pfade, kommagetrennt
+ENSEMBLE_SIZE = int(os.environ.get('MNIST_ENSEMBLE_SIZE', '0'))
+ENSEMBLE_MODELS = [m for m in os.environ.get('MNIST_ENSEMBLE_MODELS', '').split(',') if m]
+ENSEMBLE_TTA = os.environ.get('MNIST_ENSEMBLE_TTA', '0') == '1'
+ENSEMBLE_THRESHOLD = float(os.environ.get('MNIST_ENSEMBLE_THRESHOLD', '0.9'))
+# Rohe Pixel-Uploads (application/octet-stream): größte erlaubte Seitenlänge
+RAW_MAX_SIDE = int(os.environ.get('MNIST_RAW_MAX_SIDE', '2048'))
+RAW_CONTENT_TYPE = 'application/octet-stream'
+
+ENDPOINTS = [
+    '/predict - POST: Sendet Bild für Vorhersage',
+    '/predict/batch - POST: Mehrere Bilder in einem Request',
+    '/health - GET: Überprüft Backend-Status (inkl. Batching- und Cache-Statistik)',
+    '/models - GET: Verfügbare und aktive Modellversion',
+    '/reload - POST: Modellversion im Hintergrund laden und austauschen',
+    '/metrics - GET: Prometheus-Metriken (Requests, Fehler, Latenz pro Verarbeitungsstufe)'
+]
+
+
+def load_backend_engine(path):
+    """Lädt ein einzelnes Modell für das gewählte Backend (vorgewärmt) und gibt die Startzeiten aus"""
+    name = os.path.basename(path)
+    # Backend-Importe als eigene Phase, damit der Start-Trace TensorFlow-Import und Laden trennt
+    with startup.trace.phase(f'import backend {BACKEND}', 'importing'):
+        if BACKEND == 'numpy':
+            from numpy_runtime import load_numpy_model as load
+        elif BACKEND == 'tflite':
+            from quantization import load_tflite_engine
+            load = functools.partial(load_tflite_engine, buckets=INFERENCE_BUCKETS)
+        elif BACKEND == 'keras':
+            # TensorFlow erst hier importieren, damit das NumPy-Backend ohne TF auskommt
+            from inference import load_engine
+            load = functools.partial(load_engine, buckets=INFERENCE_BUCKETS, jit_compile=INFERENCE_XLA)
+        else:
+            raise ValueError(f"Unbekanntes Backend '{BACKEND}' (erwartet 'keras', 'numpy' oder 'tflite')")
+    with startup.trace.phase(f'load {name}', 'loading'):
+        new_engine = load(path, warmup=False)
+    with startup.trace.phase(f'warmup {name}', 'warming'):
+        start = time.perf_counter()
+        new_engine.warmup()
+        warmup_ms = (time.perf_counter() - start) * 1000.0
+    startup_info = new_engine.startup
+    startup_info['warmup_ms'] = warmup_ms
+    startup_info['total_ms'] += warmup_ms
+    print(f"   {path}: Laden {startup_info['load_ms']:.0f} ms, Tracing {startup_info['trace_ms']:.0f} ms, "
+          f"Warm-up {warmup_ms:.0f} ms (gesamt {startup_info['total_ms']:.0f} ms)")
+    for bucket, ms in new_engine.warmup_ms.items():
+        print(f"   Bucket {bucket:4d}: kalt {ms['cold']:.1f} ms, warm {ms['warm']:.2f} ms")
+    return new_engine
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _same_model_file(path, other):
+    """Gleiche Datei oder gleicher Inhalt (z.B. mnist_model.keras als Kopie der neuesten Version)"""
+    if os.path.abspath(path) == os.path.abspath(other):
+        return True
+    # Größe zuerst, damit nur mögliche Kopien gehasht werden
+    return os.path.getsize(path) == os.path.getsize(other) and _file_digest(path) == _file_digest(other)
+
+
+def ensemble_member_paths(primary_path):
+    """Pfade der Zusatzmodelle: MNIST_ENSEMBLE_MODELS oder die neuesten Versionen außer der primären"""
+    if ENSEMBLE_MODELS:
+        paths = [m if os.path.exists(m) else registry.resolve(m)[1] for m in ENSEMBLE_MODELS]
+    elif ENSEMBLE_SIZE <= 0:
+        # Nur TTA (MNIST_ENSEMBLE_SIZE=0): keine Zusatzmodelle
+        return []
+    else:
+        paths = [v['path'] for v in reversed(registry.versions())]
+    # Doppelte Modelle zählen sonst zweifach und kosten einen Ladevorgang ohne zusätzliche Vielfalt
+    members = []
+    for path in paths:
+        if _same_model_file(path, primary_path) or any(_same_model_file(path, m) for m in members):
+            print(f"   Ensemble: {path} übersprungen (gleiches Modell wie {primary_path} bzw. ein anderes Mitglied)")
+            continue
+        members.append(path)
+        if not ENSEMBLE_MODELS and len(members) == ENSEMBLE_SIZE:
+            break
+    return members
+
+
+def create_engine(path):
+    """Primärmodell laden; mit Ensemble-Konfiguration zusätzlich Zusatzmodelle und TTA"""
+    new_engine = load_backend_engine(path)
+    if not (ENSEMBLE_SIZE or ENSEMBLE_MODELS or ENSEMBLE_TTA):
+        return new_engine
+    from ensemble import IDENTITY, EnsembleEngine, tta_transforms
+    members = [load_backend_engine(member_path) for member_path in ensemble_member_paths(path)]
+    transforms = tta_transforms() if ENSEMBLE_TTA else IDENTITY
+    print(f"   Ensemble: {len(members)} Zusatzmodelle, {len(transforms)} TTA-Varianten, "
+          f"Schwelle {ENSEMBLE_THRESHOLD}")
+    print(f"   Ensemble-Modelle: {', '.join([path] + [member.startup['path'] for member in members])}")
+    return EnsembleEngine(new_engine, members, transforms, ENSEMBLE_THRESHOLD)
+
+
+engine = None
+cache = PredictionCache(max_bytes=CACHE_MB * 1024 * 1024)
+
+
+def _activate(new_engine):
+    # Erst die Engine tauschen, dann den Cache leeren: Ergebnisse alter Generationen werden verworfen
+    global engine
+    engine = new_engine
+    cache.clear()
+
+
+registry = ModelRegistry(BACKEND, create_engine, directory=MODEL_DIR,
+                         default_path=os.path.join(MODEL_DIR, DEFAULT_MODEL_PATHS.get(BACKEND, 'mnist_model.keras')),
+                         on_swap=_activate)
+
+forward_seconds = metrics.registry.histogram('mnist_forward_pass_seconds',
+                                             'Reiner Forward-Pass pro Batch (ohne Wartezeit in der Queue)')
+
+
+def predict_batch(batch):
+    # Aktuelle Engine erst bei Ausführung lesen; ein laufender Batch rechnet mit der alten zu Ende
+    with forward_seconds.time():
+        return engine.predict(batch)
+
+
+batcher = MicroBatcher(predict_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WAIT_MS)
+
+
+def _model_info():
+    active = registry.status()['active']
+    return [((BACKEND, active['version']), 1)] if active else []
+
+
+def _model_load_seconds():
+    active = registry.status()['active']
+    return active['load_ms'] / 1000.0 if active else None
+
+
+def _cache_lookups(field):
+    return lambda: [((kind,), count) for kind, count in sorted(cache.stats()[field].items())]
+
+
+# Gauges werden erst beim Abruf von /metrics berechnet, kosten pro Request also nichts
+metrics.registry.gauge('mnist_model_info', 'Aktive Modellversion (Wert immer 1)', _model_info,
+                       labels=('backend', 'version'))
+metrics.registry.gauge('mnist_model_load_seconds', 'Lade- und Aufwärmdauer der aktiven Modellversion',
+                       _model_load_seconds)
+metrics.registry.gauge('mnist_model_loading', '1 während eine neue Version im Hintergrund lädt',
+                       lambda: int(registry.status()['loading'] is not None))
+metrics.registry.gauge('mnist_batch_queue_depth', 'Wartende Anfragen in der Batching-Queue',
+                       lambda: batcher.stats()['queue_depth'])
+metrics.registry.gauge('mnist_ensemble_escalations_total',
+                       'Bilder, die wegen niedriger confidence zusätzlich vom Ensemble bewertet wurden',
+                       lambda: engine.stats()['escalated'] if hasattr(engine, 'stats') else None, kind='counter')
+metrics.registry.gauge('mnist_cache_hits_total', 'Cache-Treffer seit dem Start', _cache_lookups('hits'),
+                       labels=('key',), kind='counter')
+metrics.registry.gauge('mnist_cache_misses_total', 'Cache-Fehlschläge seit dem Start', _cache_lookups('misses'),
+                       labels=('key',), kind='counter')
+
+
+def start():
+    """Lädt die Startversion (MNIST_MODEL_VERSION bzw. MNIST_MODEL_PATH) und meldet Bereitschaft"""
+    print("Lade MNIST Modell...")
+    try:
+        registry.load(MODEL_VERSION, path=MODEL_PATH, background=False)
+        print(f"✓ Modell erfolgreich geladen! (Version {registry.status()['active']['version']})")
+        startup.trace.finish()
+    except Exception as e:
+        print(f"✗ Fehler beim Laden des Modells: {e}")
+        startup.trace.fail(e)
+    startup.trace.print_trace()
+
+
+def health():
+    """Status, aktive Modellversion, Inferenz-Startzeiten, Batching- und Cache-Kennzahlen"""
+    return {
+        'status': 'healthy',
+        'model_loaded': engine is not None,
+        'model': registry.status(),
+        'inference': {
+            'backend': BACKEND,
+            'buckets': list(engine.buckets),
+            'startup': engine.startup,
+            'warmup_ms': {str(b): ms for b, ms in engine.warmup_ms.items()}
+        } if engine is not None else None,
+        'ensemble': engine.stats() if hasattr(engine, 'stats') else None,
+        'batching': batcher.stats(),
+        'cache': cache.stats(),
+        'startup': startup.trace.snapshot()
+    }
+
+
+def models():
+    """Verfügbare Versionen und aktive Version"""
+    return {
+        'backend': BACKEND,
+        'versions': [{'version': v['version'], 'tag': v['tag'], 'model_type': v['model_type'], 'stamp': v['stamp']}
+                     for v in registry.versions()],
+        **registry.status()
+    }
+
+
+def reload(version=None, wait=False):
+    """
+    Lädt eine Version (None = neueste bzw. MNIST_MODEL_PATH) und wärmt sie auf, dann atomarer Austausch.
+
+    Ohne wait läuft das im Hintergrund; Requests laufen solange mit der alten Engine weiter.
+    KeyError: unbekannte Version, ReloadInProgress: es läuft bereits ein Ladevorgang.
+    """
+    path = MODEL_PATH if version is None else None
+    return registry.load(version, path=path, background=not wait)
+
+
+def shutdown(timeout=10.0):
+    """Nimmt keine Inferenz-Anfragen mehr an und arbeitet die Batching-Queue ab (graceful Shutdown)"""
+    batcher.close(timeout)
+
+
+def decode_base64(image_data):
+    """Dekodiert einen Base64-String (optional mit data:-URL Präfix) zu Rohdaten"""
+    # Eigene Stufe: 'decode' (Bild öffnen) wird pro Bild nur einmal gemessen, unabhängig vom Upload-Format
+    with metrics.stage('base64'):
+        if ',' in image_data:
+            image_data = image_data.split(',')[1]
+        return base64.b64decode(image_data)
+
+
+def decode_base64_image(image_data):
+    """Dekodiert ein Base64-Bild (optional mit data:-URL Präfix) zu einem PIL-Bild"""
+    return Image.open(io.BytesIO(decode_base64(image_data)))
+
+
+def preprocess_image(image):
+    """Bringt ein PIL-Bild in MNIST-Form: (28, 28, 1) float32 in [0, 1]"""
+    # Graustufen, LANCZOS auf 28x28, Invertierung heller Hintergründe, Normalisierung
+    return preprocess_batch([image_to_array(image)])[0]
+
+
+def load_image(image_bytes):
+    """Rohdaten -> vorverarbeitetes Bild (28, 28, 1)"""
+    with metrics.stage('decode'):
+        array = image_to_array(Image.open(io.BytesIO(image_bytes)))
+    with metrics.stage('preprocess'):
+        return preprocess_batch([array])[0]
+
+
+def raw_image_size(width, height, length):
+    """Prüft die Header X-Image-Width/-Height gegen die Body-Länge -> (Breite, Höhe); ValueError sonst"""
+    try:
+        width, height = int(width), int(height)
+    except (TypeError, ValueError):
+        raise ValueError('Header X-Image-Width und X-Image-Height (ganze Zahlen) erforderlich')
+    if not (TARGET_SIZE <= width <= RAW_MAX_SIDE and TARGET_SIZE <= height <= RAW_MAX_SIDE):
+        raise ValueError(f'Bildgröße {width}x{height} außerhalb von {TARGET_SIZE}..{RAW_MAX_SIDE} Pixeln')
+    if length != width * height:
+        raise ValueError(f'Body hat {length} Bytes, erwartet {width * height} ({width}x{height} uint8)')
+    return width, height
+
+
+def load_raw_image(buffer, width, height):
+    """Rohe Graustufen-Pixel (uint8, zeilenweise) -> vorverarbeitetes Bild (28, 28, 1), ohne PIL"""
+    with metrics.stage('decode'):
+        # View auf den Request-Body, keine Kopie; die Vorverarbeitung liest nur
+        array = np.frombuffer(buffer, dtype=np.uint8).reshape(1, height, width)
+    with metrics.stage('preprocess'):
+        return preprocess_batch(array)[0]
+
+
+def cache_entry(probabilities, img_array):
+    # Kopien, damit der Cache keine Views auf ganze Batch-Arrays festhält
+    return np.array(probabilities, dtype=np.float32), np.array(img_array, dtype=np.float32)
+
+
+def raw_cache_key(image_bytes, size=None):
+    # Rohe Pixel: gleiche Bytes mit anderen Maßen sind ein anderes Bild
+    key = cache.raw_key(image_bytes)
+    return key if size is None else f'{key}:{size[0]}x{size[1]}'
+
+
+def decode_image(image_bytes, size=None):
+    """Bilddatei (size=None) bzw. rohe Pixel mit size=(Breite, Höhe) -> (28, 28, 1)"""
+    if size is None:
+        return load_image(image_bytes)
+    return load_raw_image(image_bytes, *size)
+
+
+def classify_image_bytes(image_bytes, size=None):
+    """
+    Rohdaten -> (Wahrscheinlichkeiten, vorverarbeitetes Bild), über Cache und Batching-Queue.
+
+    size: (Breite, Höhe) bei rohen uint8-Pixeln (siehe raw_image_size), sonst Bilddatei (PNG/JPG).
+    """
+    generation = cache.generation
+    raw_key = raw_cache_key(image_bytes, size)
+    entry = cache.get(raw_key)
+    if entry is not None:
+        return entry
+
+    # Bild vorverarbeiten -> (28, 28, 1)
+    img_array = decode_image(image_bytes, size)
+    pixel_key = cache.pixel_key(img_array)
+    entry = cache.get(pixel_key)
+    if entry is None:
+        # Vorhersage machen (über die Batching-Queue gemeinsam mit parallelen Anfragen)
+        with metrics.stage('inference'):
+            probabilities = batcher.predict(img_array)
+        entry = cache_entry(probabilities, img_array)
+        cache.put(pixel_key, entry, generation)
+    cache.put(raw_key, entry, generation)
+    return entry
+
+
+def classify_batch(readers, compact=False):
+    """
+    Klassifiziert mehrere Bilder mit einem gemeinsamen Forward-Pass.
+
+    readers: Liste von Callables, die jeweils die Rohdaten eines Bildes liefern.
+    Dekodierfehler werden pro Element gemeldet; ein Fehler im Forward-Pass wird ausgelöst.
+    """
+    # Dekodieren pro Bild (Cache-Treffer überspringen alles); Fehler betreffen nur das jeweilige Element
+    generation = cache.generation
+    results = [None] * len(readers)
+    pending = []
+    for i, read in enumerate(readers):
+        try:
+            image_bytes = read()
+            raw_key = cache.raw_key(image_bytes)
+            entry = cache.get(raw_key)
+            if entry is not None:
+                results[i] = {'index': i, **prediction_result(entry[0], compact)}
+                continue
+            with metrics.stage('decode'):
+                array = image_to_array(Image.open(io.BytesIO(image_bytes)))
+            pending.append((i, raw_key, array))
+        except Exception as e:
+            results[i] = {'index': i, 'error': str(e)}
+
+    if pending:
+        # Vorverarbeitung aller übrigen Bilder, dann Pixel-Cache, dann ein Forward-Pass für den Rest
+        with metrics.stage('preprocess'):
+            batch = preprocess_batch([array for _, _, array in pending])
+        misses = []
+        for row, (i, raw_key, _) in enumerate(pending):
+            pixel_key = cache.pixel_key(batch[row])
+            entry = cache.get(pixel_key)
+            if entry is None:
+                misses.append((row, i, raw_key, pixel_key))
+                continue
+            cache.put(raw_key, entry, generation)
+            results[i] = {'index': i, **prediction_result(entry[0], compact)}
+
+        if misses:
+            with metrics.stage('inference'):
+                probabilities = predict_batch(batch[[row for row, _, _, _ in misses]])
+            for (row, i, raw_key, pixel_key), probs in zip(misses, probabilities):
+                entry = cache_entry(probs, batch[row])
+                cache.put(pixel_key, entry, generation)
+                cache.put(raw_key, entry, generation)
+                results[i] = {'index': i, **prediction_result(probs, compact)}
+
+    return {
+        'count': len(results),
+        'errors': sum(1 for result in results if 'error' in result),
+        'results': results
+    }
+
+
+def prediction_result(probabilities, compact=False):
+    """Baut das Antwort-Dict für eine Zeile Wahrscheinlichkeiten"""
+    predicted_digit = int(np.argmax(probabilities))
+    result = {
+        'prediction': predicted_digit,
+        'confidence': float(probabilities[predicted_digit]),
+    }
+    if compact:
+        # Kompakt: Wahrscheinlichkeiten als Liste (Index = Ziffer)
+        result['probabilities'] = [float(p) for p in probabilities]
+    else:
+        # Alle Wahrscheinlichkeiten zurückgeben
+        result['all_probabilities'] = {
+            str(i): float(probabilities[i])
+            for i in range(10)
+        }
+    return result
+
+
+def encode_debug_image(img_array):
+    """Vorverarbeitetes Bild (28, 28, 1) als PNG data:-URL"""
+    processed_img = (img_array[:, :, 0] * 255).astype(np.uint8)
+    processed_pil = Image.fromarray(processed_img, mode='L')
+    buffered = io.BytesIO()
+    processed_pil.save(buffered, format="PNG")
+    processed_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+    return f'data:image/png;base64,{processed_base64}'
+
+
+def is_enabled(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,109 @@
+"""
+Start-Ablauf des Backends: Bereitschaftszustand und Start-Trace
+Zustände: starting -> importing -> loading -> warming -> ready (bzw. failed).
+Jede Phase (Importe, Modell laden, Warm-up) wird mit Beginn und Dauer protokolliert;
+/health und /metrics liefern den Trace. Mit MNIST_LAZY_STARTUP=1 bindet app.py sofort
+und erledigt schwere Importe und das Laden des Modells im Hintergrund.
+Nur Standardbibliothek, damit der Import selbst nichts kostet.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+LAZY = os.environ.get('MNIST_LAZY_STARTUP', '0') == '1'
+STATES = ('starting', 'importing', 'loading', 'warming', 'ready', 'failed')
+
+
+class StartupTrace:
+    """Zustand und Phasen des Starts; nach ready/failed bleibt der Trace unverändert (z.B. bei /reload)"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.state = 'starting'
+        self.error = None
+        self.ready_ms = None
+        self.phases = []
+
+    @property
+    def done(self):
+        return self.state in ('ready', 'failed')
+
+    def _ms(self, t):
+        return (t - self._started) * 1000.0
+
+    @contextmanager
+    def phase(self, name, state=None):
+        """Misst eine Phase; state setzt gleichzeitig den Bereitschaftszustand"""
+        if self.done:
+            yield
+            return
+        if state is not None:
+            self.state = state
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases.append({'phase': name, 'state': self.state,
+                                    'start_ms': self._ms(start), 'ms': (end - start) * 1000.0})
+
+    def mark(self, name):
+        """Zeitpunkt ohne Dauer, z.B. wann der Server Verbindungen annimmt"""
+        with self._lock:
+            self.phases.append({'phase': name, 'state': self.state,
+                                'start_ms': self._ms(time.perf_counter()), 'ms': 0.0})
+
+    def finish(self):
+        self.ready_ms = self._ms(time.perf_counter())
+        self.state = 'ready'
+
+    def fail(self, error):
+        self.error = str(error)
+        self.state = 'failed'
+
+    def snapshot(self):
+        with self._lock:
+            phases = [dict(p) for p in self.phases]
+        return {
+            'state': self.state,
+            'ready': self.state == 'ready',
+            'lazy': LAZY,
+            'elapsed_ms': self._ms(time.perf_counter()),
+            'ready_ms': self.ready_ms,
+            'error': self.error,
+            'phases': phases,
+        }
+
+    def print_trace(self):
+        print(f"   Start-Trace ({self.state} nach {self._ms(time.perf_counter()):.0f} ms):")
+        for p in self.snapshot()['phases']:
+            print(f"   {p['start_ms']:8.0f} ms  {p['phase']:40} {p['ms']:8.0f} ms")
+
+
+trace = StartupTrace()
+
+
+def run_in_background(fn):
+    """Führt fn() in einem Daemon-Thread aus; Ausnahmen setzen den Zustand auf failed"""
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            print(f"✗ Start fehlgeschlagen: {e}")
+            trace.fail(e)
+
+    thread = threading.Thread(target=run, name='startup', daemon=True)
+    thread.start()
+    return thread
+
+
+metrics.registry.gauge('mnist_startup_state', 'Aktueller Startzustand (Wert 1 beim aktiven Zustand)',
+                       lambda: [((state,), int(trace.state == state)) for state in STATES], labels=('state',))
+metrics.registry.gauge('mnist_startup_phase_seconds', 'Dauer der Start-Phasen (Importe, Laden, Warm-up)',
+                       lambda: [((p['phase'],), p['ms'] / 1000.0) for p in trace.snapshot()['phases']],
+                       labels=('phase',))
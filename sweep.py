@@ -0,0 +1,279 @@
+"""
+Hyperparameter-Sweep über NN_Model.py
+Jeder Trial läuft als eigener Prozess in einem eigenen Verzeichnis (Modelle, Logs, Plots),
+mit begrenzten Threads und – unter Linux – fest zugewiesenen CPU-Kernen.
+Trials, deren beste val_accuracy unter dem Median der anderen Trials in derselben Epoche
+liegt, werden vorzeitig beendet (Median-Stopping). Am Ende steht eine Rangliste:
+Accuracy vs. Trainingszeit und Inferenz-Latenz.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NN_MODEL = os.path.join(HERE, 'NN_Model.py')
+METRICS_FILE = 'epoch_metrics.jsonl'
+SUMMARY_FILE = 'run_summary.json'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hyperparameter-Sweep über NN_Model.py (parallele Trials)")
+    parser.add_argument('--lr', type=float, nargs='+', default=[0.001], help='Learning Rates')
+    parser.add_argument('--batch', type=int, nargs='+', default=[128], help='Batchgrößen')
+    parser.add_argument('--model-type', nargs='+', choices=['dense', 'cnn'], default=['cnn'], help='Modelltypen')
+    parser.add_argument('--augment', type=int, nargs='+', choices=[0, 1], default=[0], help='Augmentation aus/an')
+    parser.add_argument('--patience', type=int, nargs='+', default=[5], help='EarlyStopping Geduld')
+    parser.add_argument('--epochs', type=int, default=10, help='Maximale Epochen pro Trial')
+    parser.add_argument('--max-trials', type=int, default=0, help='Zufällige Auswahl aus dem Raster (0 = alle)')
+    parser.add_argument('--parallel', type=int, default=0, help='Gleichzeitige Trials (0 = CPU-Kerne / --cpus-per-trial)')
+    parser.add_argument('--cpus-per-trial', type=int, default=1, help='CPU-Kerne bzw. Threads pro Trial')
+    parser.add_argument('--grace-epochs', type=int, default=2, help='Epochen vor dem ersten Median-Vergleich')
+    parser.add_argument('--min-trials', type=int, default=3, help='Mindestanzahl anderer Trials für den Median')
+    parser.add_argument('--no-stopping', action='store_true', help='Kein Median-Stopping')
+    parser.add_argument('--out', default=None, help='Ausgabeverzeichnis (Standard: sweeps/<Zeitstempel>)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed für --max-trials')
+    parser.add_argument('extra', nargs=argparse.REMAINDER,
+                        help='Weitere Argumente für NN_Model.py nach "--" (z.B. -- --pipeline tfdata)')
+    return parser.parse_args(argv)
+
+
+def build_trials(args):
+    """Raster aller Kombinationen (optional zufällig ausgedünnt)"""
+    grid = list(itertools.product(args.model_type, args.lr, args.batch, args.augment, args.patience))
+    if args.max_trials and args.max_trials < len(grid):
+        grid = random.Random(args.seed).sample(grid, args.max_trials)
+    trials = []
+    for i, (model_type, lr, batch, augment, patience) in enumerate(grid):
+        name = f"trial_{i:03d}_{model_type}_lr{lr:g}_b{batch}_aug{augment}_p{patience}"
+        trials.append({
+            'name': name,
+            'params': {'model_type': model_type, 'lr': lr, 'batch': batch, 'augment': augment, 'patience': patience},
+            'status': 'wartend',
+            'metrics': [],
+        })
+    return trials
+
+
+def trial_command(trial, args):
+    params = trial['params']
+    command = [sys.executable, NN_MODEL,
+               '--epochs', str(args.epochs),
+               '--model-type', params['model_type'],
+               '--lr', str(params['lr']),
+               '--batch', str(params['batch']),
+               '--patience', str(params['patience']),
+               '--intra-op-threads', str(args.cpus_per_trial),
+               '--inter-op-threads', '1',
+               '--metrics-file', METRICS_FILE,
+               '--summary-file', SUMMARY_FILE]
+    if params['augment']:
+        command.append('--augment')
+    extra = args.extra[1:] if args.extra[:1] == ['--'] else args.extra
+    return command + extra
+
+
+def trial_env(cpus):
+    # Auch BLAS/OpenMP-Pools außerhalb von TensorFlow begrenzen
+    env = dict(os.environ)
+    for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        env[name] = str(cpus)
+    env['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    return env
+
+
+def start_trial(trial, args, out_dir, cores):
+    trial_dir = os.path.join(out_dir, trial['name'])
+    os.makedirs(trial_dir, exist_ok=True)
+    trial['dir'] = trial_dir
+    trial['cores'] = cores
+
+    def pin():
+        # Trial auf seine Kerne festlegen, damit parallele Trials sich nicht verdrängen
+        if cores and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cores)
+
+    log = open(os.path.join(trial_dir, 'stdout.log'), 'w', encoding='utf-8')
+    trial['process'] = subprocess.Popen(trial_command(trial, args), cwd=trial_dir, env=trial_env(args.cpus_per_trial),
+                                        stdout=log, stderr=subprocess.STDOUT,
+                                        preexec_fn=pin if sys.platform != 'win32' else None)
+    trial['log'] = log
+    trial['started'] = time.perf_counter()
+    trial['status'] = 'läuft'
+
+
+def read_metrics(trial):
+    path = os.path.join(trial['dir'], METRICS_FILE)
+    if not os.path.exists(path):
+        return trial['metrics']
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    # Letzte Zeile kann gerade geschrieben werden
+    metrics = []
+    for line in lines:
+        try:
+            metrics.append(json.loads(line))
+        except ValueError:
+            break
+    trial['metrics'] = metrics
+    return metrics
+
+
+def val_accuracy(entry):
+    return entry.get('val_accuracy', entry.get('accuracy'))
+
+
+def below_median(trial, trials, args):
+    """
+    Median-Stopping: True, wenn die beste val_accuracy des Trials bis zur aktuellen Epoche
+    unter dem Median der anderen Trials in derselben Epoche liegt
+    """
+    if not trial['metrics']:
+        return False
+    epoch = trial['metrics'][-1]['epoch']
+    # Nach der letzten Epoche wird nur noch gespeichert und ausgewertet
+    if epoch < args.grace_epochs or epoch >= args.epochs:
+        return False
+    values = []
+    for other in trials:
+        if other is trial:
+            continue
+        for entry in other['metrics']:
+            if entry['epoch'] == epoch and val_accuracy(entry) is not None:
+                values.append(val_accuracy(entry))
+    if len(values) < args.min_trials:
+        return False
+    best = max(val_accuracy(entry) for entry in trial['metrics'])
+    return best < statistics.median(values)
+
+
+def finish_trial(trial, status):
+    trial['log'].close()
+    trial['seconds'] = time.perf_counter() - trial['started']
+    trial['status'] = status
+    summary_path = os.path.join(trial['dir'], SUMMARY_FILE)
+    if os.path.exists(summary_path):
+        with open(summary_path, encoding='utf-8') as f:
+            trial['summary'] = json.load(f)
+    del trial['process']
+
+
+def run_sweep(trials, args, out_dir):
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    parallel = args.parallel or max(1, cpu_count // args.cpus_per_trial)
+    # Kern-Blöcke für die parallelen Slots (nur wenn genug Kerne vorhanden sind)
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+    slots = []
+    for i in range(parallel):
+        block = available[i * args.cpus_per_trial:(i + 1) * args.cpus_per_trial]
+        slots.append(set(block) if len(block) == args.cpus_per_trial else None)
+    free_slots = list(range(parallel))
+    pending = list(trials)
+    running = []
+    print(f"{len(trials)} Trials, {parallel} parallel, {args.cpus_per_trial} CPU(s) pro Trial -> {out_dir}")
+
+    while pending or running:
+        while pending and free_slots:
+            trial = pending.pop(0)
+            trial['slot'] = free_slots.pop(0)
+            start_trial(trial, args, out_dir, slots[trial['slot']])
+            running.append(trial)
+            print(f"▶ {trial['name']}")
+
+        time.sleep(1.0)
+        for trial in running:
+            read_metrics(trial)
+        for trial in list(running):
+            code = trial['process'].poll()
+            if code is None and not args.no_stopping and below_median(trial, trials, args):
+                trial['process'].terminate()
+                trial['process'].wait()
+                finish_trial(trial, 'gestoppt')
+                print(f"✗ {trial['name']}: unter dem Median nach Epoche {trial['metrics'][-1]['epoch']}")
+            elif code is not None:
+                read_metrics(trial)
+                finish_trial(trial, 'fertig' if code == 0 else f'Fehler ({code})')
+                print(f"✓ {trial['name']}: {trial['status']} nach {trial['seconds']:.0f} s")
+            else:
+                continue
+            running.remove(trial)
+            free_slots.append(trial['slot'])
+
+
+def ranking(trials):
+    """Fertige Trials nach Test-Accuracy, danach gestoppte nach letzter val_accuracy"""
+    rows = []
+    for trial in trials:
+        summary = trial.get('summary') or {}
+        last = trial['metrics'][-1] if trial['metrics'] else {}
+        rows.append({
+            'name': trial['name'],
+            'status': trial['status'],
+            **trial['params'],
+            'epochs': len(trial['metrics']),
+            'test_accuracy': summary.get('test_accuracy'),
+            'val_accuracy': val_accuracy(last) if last else None,
+            'train_seconds': summary.get('train_seconds', sum(e['seconds'] for e in trial['metrics']) or None),
+            'latency_ms': summary.get('latency_ms'),
+            'images_per_sec': summary.get('images_per_sec'),
+            'model_file': summary.get('model_file'),
+        })
+    return sorted(rows, key=lambda row: (row['test_accuracy'] is None,
+                                         -(row['test_accuracy'] or row['val_accuracy'] or 0.0)))
+
+
+def format_table(rows):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+    lines = [f"{'#':>3}  {'Trial':44}{'Status':>10}{'Ep.':>5}{'Test-Acc':>10}{'Val-Acc':>9}"
+             f"{'Training s':>12}{'Latenz ms':>11}{'Bilder/s':>10}"]
+    for rank, row in enumerate(rows, 1):
+        lines.append(f"{rank:3d}  {row['name'][:44]:44}{row['status']:>10}{row['epochs']:5d}"
+                     f"{fmt(row['test_accuracy'], '.4f'):>10}{fmt(row['val_accuracy'], '.4f'):>9}"
+                     f"{fmt(row['train_seconds'], '.0f'):>12}{fmt(row['latency_ms'], '.2f'):>11}"
+                     f"{fmt(row['images_per_sec'], '.0f'):>10}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out_dir = os.path.abspath(args.out or os.path.join(
+        'sweeps', datetime.datetime.now().strftime('%Y%m%d_%H%M%S')))
+    os.makedirs(out_dir, exist_ok=True)
+    trials = build_trials(args)
+
+    # Datensatz-Cache einmal vorab erzeugen; parallele Trials öffnen ihn dann nur per mmap (geteilter Page-Cache)
+    subprocess.run([sys.executable, os.path.join(HERE, 'mnist.py')], env=trial_env(1), check=True)
+
+    start = time.perf_counter()
+    try:
+        run_sweep(trials, args, out_dir)
+    except KeyboardInterrupt:
+        print("Abbruch: laufende Trials werden beendet")
+        for trial in trials:
+            if 'process' in trial:
+                trial['process'].terminate()
+                trial['process'].wait()
+                finish_trial(trial, 'abgebrochen')
+
+    rows = ranking(trials)
+    table = format_table(rows)
+    print("\n" + "=" * 60)
+    print(f"Sweep-Ergebnis ({time.perf_counter() - start:.0f} s)")
+    print("=" * 60)
+    print(table)
+    with open(os.path.join(out_dir, 'sweep_summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'args': {k: v for k, v in vars(args).items()}, 'results': rows}, f, indent=2)
+    with open(os.path.join(out_dir, 'sweep_summary.txt'), 'w', encoding='utf-8') as f:
+        f.write(table + '\n')
+    print(f"\nErgebnisse: {os.path.join(out_dir, 'sweep_summary.txt')}")
+
+
+if __name__ == '__main__':
+    main()
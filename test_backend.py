@@ -1,13 +1,34 @@
 """
 Backend-Test-Skript
 Testet alle API-Endpunkte (erweitert)
+Mit --benchmark: Lasttest für /predict (Parallelität, Request-Rate, Payload-Mix),
+Ergebnis mit Durchsatz, p50/p95/p99/max und Fehlerrate als JSON.
 """
+import argparse
+import base64
+import io
+import itertools
+import json
+import os
+import subprocess
 import requests
+import threading
 import time
 import sys
 import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 BACKEND_URL = "http://localhost:5000"
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '0.0.0.0')
+BACKEND_COMMANDS = {
+    'flask': [sys.executable, os.path.join(HERE, 'serve.py')],
+    'async': [sys.executable, os.path.join(HERE, 'app_async.py')],
+}
+PAYLOAD_KINDS = ('black', 'noise', 'mnist')
+PAYLOAD_FORMATS = ('base64', 'multipart', 'raw')
 
 def timed_request(method, url, **kwargs):
     """Hilfsfunktion: misst Dauer eines Requests"""
@@ -126,7 +147,281 @@ def test_predict_random_noise():
         print(f"   ❌ Fehler: {e}")
         return False
 
+def parse_weights(spec, choices):
+    """'black=1,mnist=2' -> {'black': 1.0, 'mnist': 2.0}"""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in choices:
+            raise SystemExit(f"Unbekannter Payload-Typ '{name}' (erlaubt: {', '.join(choices)})")
+        weights[name] = float(weight) if weight else 1.0
+    return weights
+
+
+def png_bytes(pixels):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, mode='L').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_request_bodies(n, mix, formats, seed=0):
+    """
+    n vorbereitete Requests nach Gewichtung gemischt: (Typ, Format, requests-Argumente).
+    Rauschen und MNIST-Ziffern sind (fast) alle verschieden, damit der Prediction-Cache
+    nicht jeden Treffer abfängt; schwarze Bilder sind identisch (Cache-Pfad).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    kinds = list(mix)
+    kind_p = np.array([mix[k] for k in kinds]) / sum(mix.values())
+    format_names = list(formats)
+    format_p = np.array([formats[f] for f in format_names]) / sum(formats.values())
+    chosen_kinds = rng.choice(len(kinds), n, p=kind_p)
+    chosen_formats = rng.choice(len(format_names), n, p=format_p)
+
+    digits = None
+    if 'mnist' in mix:
+        from tensorflow.keras.datasets import mnist
+        (_, _), (digits, _) = mnist.load_data()
+
+    bodies = []
+    for kind_index, format_index in zip(chosen_kinds, chosen_formats):
+        kind, fmt = kinds[kind_index], format_names[format_index]
+        if kind == 'black':
+            pixels = np.zeros((28, 28), dtype=np.uint8)
+        elif kind == 'noise':
+            pixels = rng.integers(0, 256, (28, 28), dtype=np.uint8)
+        else:
+            pixels = digits[rng.integers(len(digits))]
+        if fmt == 'raw':
+            # Rohe uint8-Pixel, Maße in den Headern
+            kwargs = {'data': pixels.tobytes(), 'headers': {'Content-Type': 'application/octet-stream',
+                                                            'X-Image-Width': str(pixels.shape[1]),
+                                                            'X-Image-Height': str(pixels.shape[0])}}
+        elif fmt == 'base64':
+            image = png_bytes(pixels)
+            kwargs = {'json': {'image': 'data:image/png;base64,' + base64.b64encode(image).decode('utf-8')}}
+        else:
+            kwargs = {'files': {'image': ('digit.png', png_bytes(pixels), 'image/png')}}
+        bodies.append((kind, fmt, kwargs))
+    return bodies
+
+
+def latency_stats(latencies):
+    import numpy as np
+
+    if not latencies:
+        return {name: None for name in ('mean', 'p50', 'p95', 'p99', 'max')}
+    values = np.asarray(latencies)
+    return {
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def run_benchmark(url, bodies, concurrency, rate, duration, timeout):
+    """
+    Schickt die vorbereiteten Requests mit concurrency Threads an /predict.
+    Mit rate (Requests/s) ist die Last offen: jeder Request hat einen festen Startzeitpunkt und
+    die Latenz zählt ab diesem Zeitpunkt, Wartezeit bei überlastetem Server eingeschlossen.
+    Ohne rate schickt jeder Thread sofort den nächsten Request (geschlossene Last).
+    """
+    lock = threading.Lock()
+    # Mit duration werden die Bodies bis zum Ende wiederholt, sonst genau einmal gesendet
+    counter = itertools.count() if duration else iter(range(len(bodies)))
+    results = []
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            scheduled = start + i / rate if rate else None
+            if scheduled is not None:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            kind, fmt, kwargs = bodies[i % len(bodies)]
+            sent = time.perf_counter()
+            try:
+                response = session.post(f"{url}/predict", timeout=timeout, **kwargs)
+                status = response.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            ms = (time.perf_counter() - (scheduled or sent)) * 1000.0
+            with lock:
+                results.append((kind, fmt, status, ms))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    ok = [ms for _, _, status, ms in results if status == 200]
+    errors = len(results) - len(ok)
+    summary = {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': errors / len(results) if results else 0.0,
+        'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+        'latency_ms': latency_stats(ok),
+        'status_codes': dict(Counter(str(status) for _, _, status, _ in results)),
+    }
+    # Aufschlüsselung nach Payload-Typ und Format (nur erfolgreiche Requests)
+    for field, index in (('by_kind', 0), ('by_format', 1)):
+        groups = {}
+        for row in results:
+            groups.setdefault(row[index], []).append(row)
+        summary[field] = {
+            name: {'requests': len(rows),
+                   'errors': sum(1 for row in rows if row[2] != 200),
+                   'latency_ms': latency_stats([row[3] for row in rows if row[2] == 200])}
+            for name, rows in sorted(groups.items())
+        }
+    return summary
+
+
+def wait_for_backend(url, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def benchmark(args):
+    mix = parse_weights(args.mix, PAYLOAD_KINDS)
+    formats = parse_weights(args.formats, PAYLOAD_FORMATS)
+    # Bei --duration werden die vorbereiteten Requests zyklisch wiederholt
+    total = args.requests or 2000
+    print("=" * 60)
+    print("🚀 BACKEND BENCHMARK /predict")
+    print("=" * 60)
+    print(f"   Ziel: {args.url}, Parallelität: {args.concurrency}, "
+          f"Rate: {f'{args.rate:g}/s' if args.rate else 'unbegrenzt'}")
+    print(f"   Payloads: {args.mix} | Formate: {args.formats}")
+
+    bodies = make_request_bodies(total + args.warmup, mix, formats, seed=args.seed)
+    process = None
+    try:
+        if args.start_backend:
+            parts = urlsplit(args.url)
+            if parts.hostname not in LOCAL_HOSTS:
+                print(f"   ❌ --start-backend startet nur lokal, {args.url} zeigt auf {parts.hostname or '?'}")
+                return 1
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+            command = BACKEND_COMMANDS[args.server] + ['--port', str(port)]
+            if args.server == 'flask':
+                command += ['--workers', '1']
+            print(f"\n⏳ Starte Backend: {' '.join(command[1:])}")
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_for_backend(args.url):
+            print(f"   ❌ Backend unter {args.url} nicht erreichbar")
+            return 1
+
+        if args.warmup:
+            run_benchmark(args.url, bodies[:args.warmup], args.concurrency, None, None, args.timeout)
+        results, elapsed = run_benchmark(args.url, bodies[args.warmup:], args.concurrency, args.rate,
+                                         None if args.requests else args.duration, args.timeout)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+
+    summary = summarize(results, elapsed)
+    latency = summary['latency_ms']
+    print(f"\n   Requests: {summary['requests']} in {elapsed:.1f} s, "
+          f"Fehlerrate: {summary['error_rate']:.2%}")
+    print(f"   Durchsatz: {summary['throughput_rps']:.1f} Req/s")
+    if latency['p50'] is not None:
+        print(f"   Latenz ms: p50 {latency['p50']:.1f} | p95 {latency['p95']:.1f} | "
+              f"p99 {latency['p99']:.1f} | max {latency['max']:.1f}")
+    for field in ('by_kind', 'by_format'):
+        for name, group in summary[field].items():
+            p99 = group['latency_ms']['p99']
+            print(f"   {name:10} {group['requests']:6d} Req, {group['errors']:4d} Fehler, "
+                  f"p99 {'-' if p99 is None else f'{p99:.1f}'} ms")
+
+    report = {
+        'config': {
+            'url': args.url,
+            'server': args.server if args.start_backend else None,
+            'concurrency': args.concurrency,
+            'rate': args.rate,
+            'duration': None if args.requests else args.duration,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'mix': mix,
+            'formats': formats,
+        },
+        'elapsed_seconds': elapsed,
+        **summary,
+    }
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report gespeichert: {args.report}")
+
+    if args.max_error_rate is not None and summary['error_rate'] > args.max_error_rate:
+        print(f"❌ Fehlerrate über {args.max_error_rate:.2%}")
+        return 1
+    if args.max_p99 is not None and (latency['p99'] is None or latency['p99'] > args.max_p99):
+        print(f"❌ p99 über {args.max_p99:.0f} ms")
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Testet die Backend-Endpunkte oder misst /predict unter Last")
+    parser.add_argument('--url', default=BACKEND_URL, help='Basis-URL des Backends')
+    parser.add_argument('--benchmark', action='store_true', help='Lasttest statt Funktionstests')
+    parser.add_argument('--concurrency', type=int, default=8, help='Parallele Clients')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Requests/s (offene Last); ohne Angabe so schnell wie möglich')
+    parser.add_argument('--duration', type=float, default=10.0, help='Dauer in Sekunden')
+    parser.add_argument('--requests', type=int, default=0, help='Feste Anzahl Requests statt --duration')
+    parser.add_argument('--warmup', type=int, default=20, help='Aufwärm-Requests (nicht gewertet)')
+    parser.add_argument('--mix', default='black=1,noise=1,mnist=2',
+                        help='Payload-Mix mit Gewichten, Typen: black, noise, mnist')
+    parser.add_argument('--formats', default='base64=1,multipart=1',
+                        help='Upload-Formate mit Gewichten: base64 (JSON), multipart, raw (application/octet-stream)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Timeout pro Request in Sekunden')
+    parser.add_argument('--seed', type=int, default=0, help='Seed für den Payload-Mix')
+    parser.add_argument('--report', default='benchmark_report.json', help='JSON-Report')
+    parser.add_argument('--start-backend', action='store_true', help='Backend lokal starten (Port aus --url)')
+    parser.add_argument('--server', choices=sorted(BACKEND_COMMANDS), default='flask',
+                        help='Backend für --start-backend')
+    parser.add_argument('--max-error-rate', type=float, default=None,
+                        help='Exit-Code 1, wenn die Fehlerrate darüber liegt (z.B. 0.01)')
+    parser.add_argument('--max-p99', type=float, default=None, help='Exit-Code 1, wenn p99 (ms) darüber liegt')
+    return parser.parse_args(argv)
+
+
 def main():
+    global BACKEND_URL
+    args = parse_args()
+    args.url = args.url.rstrip('/')
+    if args.benchmark:
+        return benchmark(args)
+    BACKEND_URL = args.url
+
     print("=" * 60)
     print("🚀 BACKEND TEST (erweitert)")
     print("=" * 60)
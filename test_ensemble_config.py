@@ -0,0 +1,61 @@
+"""
+Prüft die Auswahl der Ensemble-Modelle (serving.ensemble_member_paths) ohne Modelle zu laden
+Legt zeitgestempelte Dummy-Versionen in einem temporären Verzeichnis an, darunter
+mnist_model.keras als Kopie der neuesten, und prüft TTA ohne Zusatzmodelle (Größe 0),
+die Größenbegrenzung und das Überspringen von Kopien. Exit-Code 1 bei Abweichung.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+directory = tempfile.mkdtemp(prefix='mnist_ensemble_')
+# serving liest die Konfiguration beim Import
+os.environ['MNIST_MODEL_DIR'] = directory
+os.environ['MNIST_BACKEND'] = 'keras'
+import serving  # noqa: E402
+
+STAMPS = ('20240101_120000', '20240102_120000', '20240103_120000')
+
+
+def make_versions():
+    paths = []
+    for i, stamp in enumerate(STAMPS):
+        path = os.path.join(directory, f'mnist_model_dense_{stamp}.keras')
+        with open(path, 'wb') as f:
+            f.write(f'modell {i}'.encode())
+        paths.append(path)
+    primary = os.path.join(directory, 'mnist_model.keras')
+    shutil.copyfile(paths[-1], primary)
+    return paths, primary
+
+
+def member_paths(primary, size=0, models=(), tta=False):
+    serving.ENSEMBLE_SIZE, serving.ENSEMBLE_MODELS, serving.ENSEMBLE_TTA = size, list(models), tta
+    return serving.ensemble_member_paths(primary)
+
+
+def main():
+    try:
+        (oldest, middle, newest), primary = make_versions()
+        cases = [
+            ('Nur TTA, Größe 0', member_paths(primary, size=0, tta=True), []),
+            ('Größe 1, Kopie der neuesten übersprungen', member_paths(primary, size=1), [middle]),
+            ('Größe 2', member_paths(primary, size=2, tta=True), [middle, oldest]),
+            ('Größe 5, nur vorhandene Versionen', member_paths(primary, size=5), [middle, oldest]),
+            ('Explizite Liste mit Kopie', member_paths(primary, models=[newest, oldest, oldest]), [oldest]),
+        ]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    ok = True
+    for name, actual, expected in cases:
+        passed = actual == expected
+        ok = ok and passed
+        print(f"{'✓' if passed else '✗'} {name}: {[os.path.basename(p) for p in actual]}")
+    print("✓ Ensemble-Auswahl korrekt" if ok else "✗ Ensemble-Auswahl fehlerhaft")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Paritätstest für das Falten von BatchNorm (export_model.fold_batchnorm) ohne trainiertes Modell
+Das CNN aus training.build_model und ein kleines Modell mit Conv ohne Aktivierung bekommen
+zufällige Gewichte (BatchNorm-Skalen nur positiv bzw. mit gemischtem Vorzeichen). Verglichen
+werden gefaltete und ungefaltete Operationen in der NumPy-Runtime (argmax + allclose) und die
+ungefalteten Operationen gegen Keras. Exit-Code 1 bei Abweichung.
+"""
+import argparse
+import copy
+import sys
+
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras import layers
+
+from export_model import fold_batchnorm, layers_to_ops, op_weights
+from numpy_runtime import NumpyModel
+from training import build_model
+
+
+def build_linear_conv_model():
+    """Conv ohne Aktivierung vor BatchNorm (Faltung in die vorige Schicht) und 'same'-Conv danach"""
+    inputs = keras.Input(shape=(28, 28, 1))
+    x = layers.Conv2D(8, 3)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.Conv2D(16, 3, padding='same', activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.MaxPooling2D()(x)
+    x = layers.Flatten()(x)
+    outputs = layers.Dense(10, activation='softmax')(x)
+    return keras.Model(inputs, outputs)
+
+
+def randomize_weights(model, rng, mixed_signs):
+    """He-initialisierte Kernel, zufällige BatchNorm-Statistiken; mixed_signs: gamma auch negativ"""
+    for layer in model.layers:
+        values = []
+        for weight in layer.weights:
+            shape = tuple(weight.shape)
+            if weight.name == 'kernel':
+                fan_in = int(np.prod(shape[:-1]))
+                value = rng.normal(0.0, np.sqrt(2.0 / fan_in), shape)
+            elif weight.name == 'gamma':
+                value = rng.uniform(0.5, 1.5, shape)
+                if mixed_signs:
+                    value *= rng.choice([-1.0, 1.0], shape)
+            elif weight.name == 'moving_variance':
+                value = rng.uniform(0.5, 2.0, shape)
+            else:
+                # bias, beta, moving_mean
+                value = rng.normal(0.0, 0.1, shape)
+            values.append(value.astype(np.float32))
+        if values:
+            layer.set_weights(values)
+
+
+def numpy_model(ops, input_shape):
+    return NumpyModel([op for op, _ in ops], op_weights(ops), input_shape)
+
+
+def check(name, model, x, atol):
+    input_shape = tuple(model.inputs[0].shape[1:])
+    ops = layers_to_ops(model)
+    # fold_batchnorm ändert die Gewichte der Nachbarschichten, daher auf einer Kopie falten
+    folded_ops, folded, kept = fold_batchnorm(copy.deepcopy(ops))
+    keras_probs = model.predict(x.reshape((-1,) + input_shape), verbose=0)
+    unfolded_probs = numpy_model(ops, input_shape).predict(x)
+    folded_probs = numpy_model(folded_ops, input_shape).predict(x)
+
+    fold_diff = float(np.abs(folded_probs - unfolded_probs).max())
+    keras_diff = float(np.abs(keras_probs - unfolded_probs).max())
+    mismatches = int((folded_probs.argmax(axis=1) != unfolded_probs.argmax(axis=1)).sum())
+    ok = (mismatches == 0 and np.allclose(folded_probs, unfolded_probs, atol=atol)
+          and np.allclose(keras_probs, unfolded_probs, atol=atol))
+    print(f"{'✓' if ok else '✗'} {name:32} gefaltet: {folded}, behalten: {kept}, "
+          f"Argmax-Abweichungen: {mismatches}, max. Differenz gefaltet/ungefaltet: {fold_diff:.1e}, "
+          f"NumPy/Keras: {keras_diff:.1e}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüft das Falten von BatchNorm mit zufälligen Gewichten")
+    parser.add_argument('--samples', type=int, default=256, help='Zufällige Eingabebilder pro Modell')
+    parser.add_argument('--atol', type=float, default=1e-5, help='Toleranz für Wahrscheinlichkeiten')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    x = rng.uniform(0.0, 1.0, (args.samples, 28, 28)).astype(np.float32)
+    builders = [('cnn', lambda: build_model('cnn')), ('conv_linear', build_linear_conv_model)]
+    ok = True
+    for model_name, builder in builders:
+        for mixed_signs in (False, True):
+            model = builder()
+            randomize_weights(model, rng, mixed_signs)
+            name = f"{model_name} ({'gemischte' if mixed_signs else 'positive'} Skalen)"
+            ok = check(name, model, x, args.atol) and ok
+    print("✓ Parität bestätigt" if ok else "✗ Parität verletzt")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,83 +1,170 @@
 """
-Lokaler Test des trainierten Modells mit MNIST-Testdaten
+Lokale Evaluation des trainierten Modells mit MNIST-Testdaten
+Ein einziger gebatchter Forward-Pass über alle Testbilder; Genauigkeit, Fehlerliste,
+Metriken pro Klasse und Konfusionsmatrix werden aus dem Wahrscheinlichkeits-Array berechnet.
 """
+import argparse
+import json
+import time
+
 import numpy as np
 from tensorflow import keras
-from tensorflow.keras.datasets import mnist
-import matplotlib.pyplot as plt
-
-# Modell laden
-print("Lade Modell...")
-model = keras.models.load_model('mnist_model.keras')
-print("✓ Modell geladen\n")
-
-# MNIST Test-Daten laden
-(_, _), (x_test, y_test) = mnist.load_data()
-
-# Daten vorbereiten (genau wie im Training)
-x_test = x_test.astype("float32") / 255.0
-x_test = np.expand_dims(x_test, -1)  # (N, 28, 28, 1)
-
-print("Teste 10 zufällige Bilder...\n")
-
-# 10 zufällige Indizes
-random_indices = np.random.choice(len(x_test), 10, replace=False)
-
-correct = 0
-for idx in random_indices:
-    # Vorhersage
-    img = x_test[idx:idx+1]  # (1, 28, 28, 1)
-    pred = model.predict(img, verbose=0)
-    predicted_digit = np.argmax(pred[0])
-    confidence = pred[0][predicted_digit]
-    actual = y_test[idx]
-
-    is_correct = predicted_digit == actual
-    if is_correct:
-        correct += 1
-
-    status = "✓" if is_correct else "✗"
-    print(f"{status} Bild #{idx}: Vorhersage={predicted_digit} (Konfidenz: {confidence:.2%}), Tatsächlich={actual}")
-
-print(f"\n{'='*60}")
-print(f"Genauigkeit: {correct}/10 = {correct/10:.0%}")
-print(f"{'='*60}")
-
-# Visualisierung der ersten 5 Fehler (falls vorhanden)
-print("\nSuche nach Fehlern in den ersten 100 Testbildern...")
-errors = []
-for i in range(100):
-    img = x_test[i:i+1]
-    pred = model.predict(img, verbose=0)
-    predicted = np.argmax(pred[0])
-    actual = y_test[i]
-    if predicted != actual:
-        errors.append((i, predicted, actual, pred[0]))
-
-if errors:
-    print(f"Gefunden: {len(errors)} Fehler\n")
-
-    # Visualisiere erste 5 Fehler
-    n_show = min(5, len(errors))
-    plt.figure(figsize=(15, 3))
-    for i, (idx, pred, actual, probs) in enumerate(errors[:n_show]):
-        plt.subplot(1, n_show, i+1)
+
+import mnist
+from inference import InferenceEngine
+
+
+def timed_predict(engine, x):
+    """Ein vollständiger Durchlauf über x -> (Wahrscheinlichkeiten, Sekunden)"""
+    start = time.perf_counter()
+    probabilities = engine.predict(x)
+    return probabilities, time.perf_counter() - start
+
+
+def confusion_matrix(y_true, y_pred, num_classes):
+    """Zeilen = tatsächliche Klasse, Spalten = Vorhersage"""
+    counts = np.bincount(y_true * num_classes + y_pred, minlength=num_classes * num_classes)
+    return counts.reshape(num_classes, num_classes)
+
+
+def per_class_metrics(matrix):
+    """Precision, Recall, F1 und Support pro Klasse aus der Konfusionsmatrix"""
+    true_positives = np.diag(matrix).astype(np.float64)
+    predicted = matrix.sum(axis=0)
+    support = matrix.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = np.where(support > 0, true_positives / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return precision, recall, f1, support
+
+
+def save_error_plot(x_test, y_test, predictions, probabilities, error_indices, path):
+    import matplotlib.pyplot as plt
+
+    n_show = len(error_indices)
+    plt.figure(figsize=(3 * n_show, 3))
+    for i, idx in enumerate(error_indices):
+        pred = predictions[idx]
+        plt.subplot(1, n_show, i + 1)
         plt.imshow(x_test[idx].squeeze(), cmap='gray')
-        plt.title(f"Pred: {pred} ({probs[pred]:.1%})\nActual: {actual}", fontsize=10)
+        plt.title(f"Pred: {pred} ({probabilities[idx, pred]:.1%})\nActual: {y_test[idx]}", fontsize=10)
         plt.axis('off')
-
     plt.tight_layout()
-    plt.savefig('model_errors.png')
-    print("✓ Fehler-Visualisierung gespeichert: model_errors.png")
-else:
-    print("✓ Keine Fehler in den ersten 100 Testbildern gefunden!")
-
-# Gesamtauswertung
-print("\n" + "="*60)
-print("Vollständige Evaluation auf allen 10.000 Testbildern...")
-print("="*60)
-loss, acc = model.evaluate(x_test, y_test, verbose=0)
-print(f"Test-Loss: {loss:.4f}")
-print(f"Test-Accuracy: {acc:.4%}")
-print("="*60)
+    plt.savefig(path)
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluiert das Modell auf allen MNIST-Testbildern")
+    parser.add_argument('--model', default='mnist_model.keras', help='Pfad zum .keras Modell')
+    parser.add_argument('--batch-sizes', default='1000',
+                        help='Batchgrößen, kommagetrennt; die erste liefert die Auswertung, '
+                             'weitere werden nur für den Durchsatz gemessen')
+    parser.add_argument('--samples', type=int, default=10, help='Zufällige Beispiele in der Ausgabe')
+    parser.add_argument('--show-errors', type=int, default=5, help='Fehler in model_errors.png (0 = keine Grafik)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed für die zufälligen Beispiele')
+    parser.add_argument('--json', default=None, help='Ergebnisse zusätzlich als JSON speichern')
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    # Modell laden
+    print("Lade Modell...")
+    model = keras.models.load_model(args.model, compile=False)
+    print("✓ Modell geladen\n")
+
+    # MNIST Test-Daten aus dem vorverarbeiteten Cache (gleiche Pipeline wie im Backend, per mmap)
+    x_test, y_test = mnist.load('test', 'float32')  # (N, 28, 28, 1)
+
+    # Ein Durchlauf pro Batchgröße; Warm-up (Tracing) zählt nicht zum Durchsatz
+    probabilities = None
+    throughput = {}
+    for batch_size in batch_sizes:
+        engine = InferenceEngine(model, buckets=(batch_size,))
+        engine.warmup(repeats=1)
+        result, seconds = timed_predict(engine, x_test)
+        throughput[batch_size] = len(x_test) / seconds
+        if probabilities is None:
+            probabilities = result
+
+    num_classes = probabilities.shape[1]
+    predictions = probabilities.argmax(axis=1)
+    confidences = probabilities[np.arange(len(predictions)), predictions]
+    correct = predictions == y_test
+    accuracy = float(correct.mean())
+    # Kreuzentropie wie model.evaluate (sparse_categorical_crossentropy)
+    true_probs = np.clip(probabilities[np.arange(len(y_test)), y_test], 1e-7, 1.0)
+    loss = float(-np.log(true_probs).mean())
+    error_indices = np.flatnonzero(~correct)
+
+    print("=" * 60)
+    print("Durchsatz (ganzer Testdatensatz)")
+    print("=" * 60)
+    for batch_size, images_per_sec in throughput.items():
+        print(f"Batchgröße {batch_size:5d}: {images_per_sec:10.0f} Bilder/s")
+
+    rng = np.random.default_rng(args.seed)
+    random_indices = rng.choice(len(x_test), min(args.samples, len(x_test)), replace=False)
+    print(f"\n{len(random_indices)} zufällige Bilder:\n")
+    for idx in random_indices:
+        status = "✓" if correct[idx] else "✗"
+        print(f"{status} Bild #{idx}: Vorhersage={predictions[idx]} (Konfidenz: {confidences[idx]:.2%}), "
+              f"Tatsächlich={y_test[idx]}")
+
+    matrix = confusion_matrix(y_test, predictions, num_classes)
+    precision, recall, f1, support = per_class_metrics(matrix)
+
+    print("\n" + "=" * 60)
+    print("Metriken pro Klasse")
+    print("=" * 60)
+    print(f"{'Klasse':>6} {'Precision':>10} {'Recall':>8} {'F1':>8} {'Support':>8}")
+    for digit in range(num_classes):
+        print(f"{digit:6d} {precision[digit]:10.4f} {recall[digit]:8.4f} {f1[digit]:8.4f} {support[digit]:8d}")
+    print(f"{'Makro':>6} {precision.mean():10.4f} {recall.mean():8.4f} {f1.mean():8.4f} {support.sum():8d}")
+
+    print("\nKonfusionsmatrix (Zeile = tatsächlich, Spalte = Vorhersage):")
+    print("      " + "".join(f"{digit:6d}" for digit in range(num_classes)))
+    for digit in range(num_classes):
+        print(f"{digit:6d}" + "".join(f"{count:6d}" for count in matrix[digit]))
+
+    # Häufigste Verwechslungen (ohne Diagonale)
+    off_diagonal = matrix * (1 - np.eye(num_classes, dtype=matrix.dtype))
+    top = np.argsort(off_diagonal, axis=None)[::-1][:5]
+    confusions = [(int(i // num_classes), int(i % num_classes), int(off_diagonal.flat[i]))
+                  for i in top if off_diagonal.flat[i] > 0]
+    if confusions:
+        print("\nHäufigste Verwechslungen:")
+        for actual, pred, count in confusions:
+            print(f"  {actual} → {pred}: {count}x")
+
+    print(f"\nGefunden: {len(error_indices)} Fehler")
+    if len(error_indices) and args.show_errors > 0:
+        # Sicherste Fehlvorhersagen zuerst
+        worst = error_indices[np.argsort(-confidences[error_indices])][:args.show_errors]
+        save_error_plot(x_test, y_test, predictions, probabilities, worst, 'model_errors.png')
+        print("✓ Fehler-Visualisierung gespeichert: model_errors.png")
+
+    print("\n" + "=" * 60)
+    print(f"Test-Loss: {loss:.4f}")
+    print(f"Test-Accuracy: {accuracy:.4%} ({int(correct.sum())}/{len(y_test)})")
+    print("=" * 60)
+
+    if args.json:
+        report = {
+            'model': args.model,
+            'test_accuracy': accuracy,
+            'test_loss': loss,
+            'errors': [{'index': int(i), 'predicted': int(predictions[i]), 'actual': int(y_test[i]),
+                        'confidence': float(confidences[i])} for i in error_indices],
+            'per_class': {str(d): {'precision': float(precision[d]), 'recall': float(recall[d]),
+                                   'f1': float(f1[d]), 'support': int(support[d])} for d in range(num_classes)},
+            'confusion_matrix': matrix.tolist(),
+            'images_per_sec': {str(b): v for b, v in throughput.items()},
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Ergebnisse gespeichert: {args.json}")
+
 
+if __name__ == '__main__':
+    main()
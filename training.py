@@ -0,0 +1,417 @@
+"""
+Trainings-API für das MNIST-Modell (Dense oder CNN)
+Daten vorbereiten, Modell bauen, trainieren, evaluieren, speichern/exportieren und
+Reports schreiben als einzelne Funktionen; NN_Model.py ist nur noch die Kommandozeile.
+Plots und Reports erzeugt report_worker.py in einem eigenen Prozess (ohne TensorFlow).
+
+    import training
+    (x_train, y_train), (x_test, y_test) = training.prepare_data('dense')
+    result = training.train(x_train, y_train, x_test, y_test, model_type='dense', epochs=3)
+    test_loss, test_acc = training.evaluate(result['model'], x_test, y_test)
+    training.save_model(result['model'], 'dense')
+"""
+import datetime
+import functools
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+
+import mnist
+from data_pipeline import EpochTimer
+from model_registry import atomic_write
+
+
+def log_status(msg):
+    ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    line = f"[{ts}] {msg}"
+    try:
+        with open('training_status.log', 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except Exception:
+        pass
+    print(line, flush=True)
+
+
+def cpu_supports_bfloat16():
+    """Native bfloat16-Befehle (AVX512_BF16 / AMX) laut /proc/cpuinfo"""
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def configure_runtime(mixed_precision='off', intra_op_threads=0, inter_op_threads=0, finetune=False):
+    """Thread-Pools und Mixed-Precision-Policy setzen; gibt die tatsächlich verwendete Präzision zurück"""
+    # Thread-Pools lassen sich nur vor der ersten TensorFlow-Operation festlegen
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        print("⚠️ TensorFlow ist bereits initialisiert: Thread-Einstellungen werden ignoriert")
+
+    precision = mixed_precision
+    if precision == 'auto':
+        precision = 'bfloat16' if cpu_supports_bfloat16() else 'off'
+    elif precision == 'bfloat16' and not cpu_supports_bfloat16():
+        print("⚠️ CPU ohne native bfloat16-Befehle: bfloat16 wird emuliert und ist vermutlich langsamer")
+    if finetune and precision != 'off':
+        # Das geladene Modell bringt seine eigenen (float32) Layer-Dtypes mit
+        print("⚠️ Mixed Precision wird beim Fine-Tuning nicht angewendet")
+        precision = 'off'
+    keras.mixed_precision.set_global_policy(f'mixed_{precision}' if precision != 'off' else 'float32')
+    return precision
+
+
+def load_base_model(path):
+    """Vorhandenes Modell für Fine-Tuning -> (Modell, Modelltyp)"""
+    model = keras.models.load_model(path)
+    return model, 'dense' if len(model.inputs[0].shape) == 3 else 'cnn'
+
+
+def mix_finetune_data(path, x_train, y_train, replay_ratio=1.0, seed=0):
+    """Neue Bilder aus path (.npz) + zufällige Replay-Auswahl alter Bilder, gemischt"""
+    with np.load(path) as new_data:
+        x_key, y_key = ('x', 'y') if 'x' in new_data else ('x_train', 'y_train')
+        x_new, y_new = new_data[x_key].astype(np.uint8), new_data[y_key].astype(y_train.dtype)
+    x_new = x_new.reshape((len(x_new),) + x_train.shape[1:])
+    rng = np.random.default_rng(seed)
+    n_replay = min(len(x_train), int(round(len(x_new) * replay_ratio)))
+    replay_idx = rng.choice(len(x_train), n_replay, replace=False)
+    # Gemischt, damit validation_split nicht nur alte oder nur neue Bilder erwischt
+    order = rng.permutation(len(x_new) + n_replay)
+    x_train = np.concatenate([x_new, x_train[replay_idx]])[order]
+    y_train = np.concatenate([y_new, y_train[replay_idx]])[order]
+    return x_train, y_train, len(x_new), n_replay
+
+
+def prepare_data(model_type='cnn', pipeline='numpy', finetune_data=None, replay_ratio=1.0, log_fn=log_status):
+    """
+    MNIST aus dem mmap-Cache (mnist.py) in der Form, die Modelltyp und Pipeline erwarten.
+
+    numpy: float32 in [0, 1]; tfdata: x_train bleibt uint8 (Normalisierung pro Batch).
+    CNN: (N, 28, 28, 1), Dense: (N, 28, 28). Gibt ((x_train, y_train), (x_test, y_test)) zurück.
+    """
+    # tf.data und Fine-Tuning brauchen die uint8-Bilder, sonst direkt die normalisierten float32-Bilder
+    train_dtype = 'uint8' if pipeline == 'tfdata' or finetune_data else 'float32'
+    x_train, y_train = mnist.load('train', train_dtype)
+    x_test, y_test = mnist.load('test', 'float32')
+    log_fn(f"MNIST Daten geladen (Cache: {mnist.CACHE_DIR}, Training als {train_dtype})")
+
+    if finetune_data:
+        x_train, y_train, n_new, n_replay = mix_finetune_data(finetune_data, x_train, y_train, replay_ratio)
+        log_fn(f"Fine-Tuning-Daten: {n_new} neue + {n_replay} Replay-Bilder")
+    print(f"Training: {len(x_train)} Bilder, Test: {len(x_test)} Bilder")
+
+    # Normalisierung nur noch für uint8-Daten (tf.data: x_train bleibt uint8 und wird erst pro Batch normalisiert)
+    if pipeline == 'numpy' and x_train.dtype == np.uint8:
+        x_train = x_train.astype("float32") / 255.0
+
+    # Der Cache hat die Kanal-Dimension (N,28,28,1): für CNN ergänzen, für Dense entfernen (Views, keine Kopie)
+    if model_type == 'cnn':
+        if x_train.ndim == 3:
+            x_train = np.expand_dims(x_train, -1)
+        log_fn("Kanal-Dimension für CNN")
+    else:
+        if x_train.ndim == 4:
+            x_train = x_train[..., 0]
+        x_test = x_test[..., 0]
+    return (x_train, y_train), (x_test, y_test)
+
+
+def build_model(model_type):
+    """Dense oder CNN; die Ausgabeschicht rechnet auch bei Mixed Precision in float32"""
+    if model_type == 'dense':
+        return keras.Sequential([
+            layers.Flatten(input_shape=(28, 28)),
+            layers.Dense(256, activation='relu'),
+            layers.Dropout(0.3),
+            layers.Dense(128, activation='relu'),
+            layers.Dropout(0.3),
+            layers.Dense(64, activation='relu'),
+            layers.Dropout(0.2),
+            layers.Dense(10, activation='softmax', dtype='float32')
+        ])
+    # CNN Modell für bessere Generalisierung
+    inputs = keras.Input(shape=(28, 28, 1))
+    x = layers.Conv2D(32, 3, activation='relu')(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.Conv2D(64, 3, activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.MaxPooling2D()(x)
+    x = layers.Dropout(0.25)(x)
+    x = layers.Conv2D(128, 3, activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.MaxPooling2D()(x)
+    x = layers.Dropout(0.25)(x)
+    x = layers.Flatten()(x)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.Dropout(0.5)(x)
+    outputs = layers.Dense(10, activation='softmax', dtype='float32')(x)
+    return keras.Model(inputs, outputs)
+
+
+def compile_model(model, lr=0.001, jit_compile=False):
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=lr),
+                  loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'],
+                  jit_compile=jit_compile)
+    return model
+
+
+def run_name(model_type, tag='', finetune=False):
+    # finetune: eigener Checkpoint-Name, damit Fine-Tuning und Training von Grund auf sich nicht überschreiben
+    return 'mnist_model' + ('_finetune' if finetune else '') + (f"_{tag}" if tag else '') + f"_{model_type}"
+
+
+class CheckpointModeMismatch(ValueError):
+    """Checkpoint wurde von einem Lauf im anderen Modus (scratch/finetune) geschrieben"""
+
+
+# Markierung im Checkpoint-Verzeichnis: mit welchem Modus (scratch/finetune) er geschrieben wurde
+_RUN_MODE_FILE = 'run_mode.json'
+
+
+def _check_run_mode(path, mode, log_fn):
+    """Fortsetzen nur im selben Modus; CheckpointModeMismatch, wenn der Checkpoint vom anderen Modus stammt"""
+    try:
+        with open(os.path.join(path, _RUN_MODE_FILE), encoding='utf-8') as f:
+            found = json.load(f).get('mode')
+    except (OSError, ValueError):
+        log_fn(f"⚠️ Checkpoint {path} ohne Modus-Angabe (älterer Lauf), setze trotzdem fort")
+        return
+    if found != mode:
+        raise CheckpointModeMismatch(f"Checkpoint {path} stammt aus einem {found}-Lauf, dieser Lauf ist {mode}; "
+                         f"ohne --resume neu starten oder den passenden Lauf fortsetzen")
+
+
+def make_callbacks(patience=5, epoch_timer=None, checkpoint_dir='checkpoints', name='mnist_model',
+                   resume=False, mode='scratch', log_fn=log_status):
+    """
+    EarlyStopping, LR-Plateau, Epochen-Timing und (optional) Checkpoints pro Epoche
+
+    mode ('scratch' oder 'finetune') wird im Checkpoint vermerkt; resume in einen Checkpoint
+    des anderen Modus löst CheckpointModeMismatch aus.
+    """
+    callbacks = [
+        keras.callbacks.EarlyStopping(monitor='val_accuracy', patience=patience, restore_best_weights=True),
+        keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, verbose=1),
+    ]
+    if epoch_timer is not None:
+        callbacks.append(epoch_timer)
+
+    # Checkpoints: Gewichte, Optimizer-Zustand und Epoche nach jeder Epoche (nach Erfolg gelöscht)
+    if checkpoint_dir:
+        path = os.path.join(checkpoint_dir, name)
+        if os.path.isdir(path) and not resume:
+            # Ohne resume beginnt jeder Lauf neu, statt stillschweigend einen alten fortzusetzen
+            shutil.rmtree(path)
+            log_fn(f"Alter Checkpoint verworfen: {path}")
+        elif resume:
+            found = os.path.isdir(path)
+            if found:
+                _check_run_mode(path, mode, log_fn)
+            log_fn(f"Fortsetzen ab Checkpoint: {path}" if found else f"Kein Checkpoint in {path}, starte neu")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, _RUN_MODE_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'mode': mode}, f)
+        callbacks.append(keras.callbacks.BackupAndRestore(path))
+    return callbacks
+
+
+def train(x_train, y_train, x_test, y_test, model=None, model_type='cnn', epochs=20, batch=128, lr=0.001,
+          augment=False, patience=5, pipeline='numpy', precision='off', jit_compile=False, metrics_file=None,
+          checkpoint_dir='checkpoints', tag='', resume=False, log_fn=log_status):
+    """
+    Baut (bzw. übernimmt) und trainiert das Modell.
+
+    precision: Ergebnis von configure_runtime(); bei Mixed Precision wird das Ergebnis in ein
+    float32-Modell übertragen. Gibt ein Dict mit model, history, train_seconds und timing zurück.
+    """
+    finetune = model is not None
+    if model is None:
+        model = build_model(model_type)
+    model.summary()
+    log_fn("Modell erstellt")
+
+    # Optional Data Augmentation
+    train_data = None
+    validation_data = None
+    augment = augment and model_type == 'cnn'
+    if pipeline == 'tfdata':
+        from data_pipeline import make_dataset
+        # Wie bisher: mit Augmentation validiert das Testset, sonst die letzten 10% von x_train
+        if augment:
+            x_fit, y_fit = x_train, y_train
+            validation_data = (x_test, y_test)
+        else:
+            split = int(len(x_train) * 0.9)
+            x_fit, y_fit = x_train[:split], y_train[:split]
+            validation_data = make_dataset(x_train[split:], y_train[split:], batch)
+        train_data = make_dataset(x_fit, y_fit, batch, training=True, augment=augment)
+        log_fn(f"tf.data Pipeline erstellt (Augmentation: {augment})")
+    elif augment:
+        datagen = keras.preprocessing.image.ImageDataGenerator(
+            rotation_range=10,
+            width_shift_range=0.1,
+            height_shift_range=0.1,
+            zoom_range=0.1
+        )
+        datagen.fit(x_train)
+        train_data = datagen.flow(x_train, y_train, batch_size=batch)
+        validation_data = (x_test, y_test)
+        log_fn("Data Augmentation aktiviert")
+
+    compile_model(model, lr, jit_compile)
+    log_fn("Modell kompiliert")
+
+    epoch_timer = EpochTimer(log_fn, batch_size=batch, jsonl_path=metrics_file)
+    callbacks = make_callbacks(patience, epoch_timer, checkpoint_dir, run_name(model_type, tag, finetune), resume,
+                               'finetune' if finetune else 'scratch', log_fn)
+
+    log_fn("Starte Training")
+    train_start = time.perf_counter()
+    if train_data is not None:
+        history = model.fit(train_data, epochs=epochs, validation_data=validation_data, verbose=1, callbacks=callbacks)
+    else:
+        history = model.fit(x_train, y_train, epochs=epochs, batch_size=batch, validation_split=0.1, verbose=1,
+                            callbacks=callbacks)
+    train_seconds = time.perf_counter() - train_start
+    log_fn("Training abgeschlossen (raw)")
+    timing = epoch_timer.summary()
+
+    if precision != 'off':
+        # Gespeichert wird ein reines float32-Modell (Serving, NumPy-Export und int8-Quantisierung erwarten float32)
+        keras.mixed_precision.set_global_policy('float32')
+        float_model = build_model(model_type)
+        float_model.set_weights(model.get_weights())
+        model = compile_model(float_model, lr)
+        log_fn("Gewichte in float32-Modell übernommen")
+
+    return {'model': model, 'history': history, 'train_seconds': train_seconds, 'timing': timing}
+
+
+def evaluate(model, x_test, y_test, log_fn=log_status):
+    """-> (test_loss, test_acc)"""
+    test_loss, test_acc = model.evaluate(x_test, y_test, verbose=1)
+    print(f"Test accuracy: {test_acc:.4f}")
+    log_fn(f"Evaluation abgeschlossen: acc={test_acc:.4f}")
+    return float(test_loss), float(test_acc)
+
+
+def save_model(model, model_type, tag='', log_fn=log_status):
+    """Speichert mnist_model[_tag]_<typ>_<Zeitstempel>.keras und ersetzt mnist_model.keras; gibt den Dateinamen zurück"""
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_name = f"{run_name(model_type, tag)}_{stamp}.keras"
+    # Atomar schreiben: ein laufendes Backend (Registry, /reload) sieht nie eine halbe Datei
+    atomic_write(file_name, model.save)
+    print(f"Modell gespeichert als {file_name}")
+    log_fn(f"Gespeichert: {file_name} & mnist_model.keras aktualisiert")
+    # Zusätzlich aktuelles Standardmodell ersetzen
+    atomic_write('mnist_model.keras', functools.partial(shutil.copyfile, file_name))
+    print("Standardmodell aktualisiert: mnist_model.keras")
+    log_fn("Standardmodell aktualisiert")
+    return file_name
+
+
+def export_numpy_model(model, file_name, log_fn=log_status):
+    """Export für die NumPy-Runtime (Serving ohne TensorFlow) neben file_name und als mnist_model.npz"""
+    from export_model import export_numpy
+    npz_name = os.path.splitext(file_name)[0] + '.npz'
+    folded, kept = atomic_write(npz_name, functools.partial(export_numpy, model))
+    atomic_write('mnist_model.npz', functools.partial(shutil.copyfile, npz_name))
+    print(f"NumPy-Export gespeichert: mnist_model.npz (BatchNorm gefaltet: {folded}, behalten: {kept})")
+    log_fn("NumPy-Export geschrieben")
+    return npz_name
+
+
+def quantize_model(model, file_name, x_train, x_test, y_test, calib_samples=500, log_fn=log_status):
+    """int8-Variante neben dem .keras Modell + Vergleichsreport float32 vs. int8"""
+    from quantization import quantize_int8, write_quantization_report
+    log_fn("Starte int8-Quantisierung")
+    calib_idx = np.random.default_rng(0).choice(len(x_train), min(calib_samples, len(x_train)), replace=False)
+    int8_name = os.path.splitext(file_name)[0] + '_int8.tflite'
+    calib_data = x_train[calib_idx]
+    if calib_data.dtype == np.uint8:
+        calib_data = calib_data.astype("float32") / 255.0
+    int8_size = atomic_write(int8_name, functools.partial(quantize_int8, model, calib_data))
+    atomic_write('mnist_model_int8.tflite', functools.partial(shutil.copyfile, int8_name))
+    print(f"int8-Modell gespeichert als {int8_name} ({int8_size / 1024:.0f} KB)")
+    write_quantization_report(model, file_name, int8_name, x_test, y_test)
+    print("Quantisierungsreport gespeichert (quantization_report.txt)")
+    log_fn("int8-Modell & Quantisierungsreport geschrieben")
+    return int8_name
+
+
+def write_summary(path, model, result, test_loss, test_acc, file_name, options=None, log_fn=log_status):
+    """Zusammenfassung für Vergleiche (z.B. sweep.py), inkl. Serving-Latenz des gespeicherten Modells"""
+    from inference import InferenceEngine
+    engine = InferenceEngine(model, buckets=(1, 128))
+    engine.warmup(repeats=20)
+    summary = {
+        'args': options or {},
+        'test_accuracy': float(test_acc),
+        'test_loss': float(test_loss),
+        'epochs': len(result['history'].history.get('loss', [])),
+        'train_seconds': result['train_seconds'],
+        'epoch_timing': result['timing'],
+        'latency_ms': engine.warmup_ms[1]['warm'],
+        'images_per_sec': 128 / (engine.warmup_ms[128]['warm'] / 1000.0),
+        'model_file': file_name,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    log_fn(f"Zusammenfassung geschrieben ({path})")
+    return summary
+
+
+def write_reports(model, x_test, y_test, history, model_file='', x_train=None, y_train=None,
+                  out_dir='.', wait=False, log_fn=log_status):
+    """
+    Speichert die Testvorhersagen und startet report_worker.py als eigenen Prozess
+
+    Der Worker erzeugt Vorhersage-Grafik, Confusion Matrix, Classification Report (txt + JSON)
+    und Trainingskurven ohne TensorFlow; das Training wartet nur mit wait=True darauf.
+    Gibt den subprocess.Popen des Workers zurück.
+    """
+    import subprocess
+    import sys
+
+    # Einziger Forward-Pass über die Testdaten; alles Weitere rechnet der Worker daraus
+    probabilities = model.predict(x_test, verbose=0)
+    predicted_labels = np.argmax(probabilities, axis=1)
+    print(f"Vorhersagen für die ersten 5 Testbilder: {predicted_labels[:5]}")
+    print(f"Tatsächliche Labels für die ersten 5 Testbilder: {y_test[:5]}")
+    log_fn("Vorhersagen für die Testbilder gemacht")
+
+    if x_train is None:
+        x_train, y_train = x_test, y_test
+    history_dict = getattr(history, 'history', history) or {}
+    data = {
+        'probabilities': probabilities.astype(np.float32),
+        'y_test': np.asarray(y_test, dtype=np.int64),
+        'samples': np.asarray(x_test[:8]),
+        'train_sample': np.asarray(x_train[0]),
+        'train_label': np.int64(y_train[0]),
+        'history': json.dumps({key: [float(v) for v in values] for key, values in history_dict.items()}),
+        'model_file': model_file,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    data_path = os.path.join(out_dir, f"{os.path.splitext(os.path.basename(model_file))[0] or 'mnist_model'}_report.npz")
+    atomic_write(data_path, lambda tmp: np.savez(tmp, **data))
+
+    worker = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_worker.py')
+    process = subprocess.Popen([sys.executable, worker, data_path, '--out-dir', out_dir])
+    log_fn(f"Reports werden im Hintergrund erzeugt (PID {process.pid}, {data_path})")
+    if wait:
+        process.wait()
+    return process